@@ -4,15 +4,136 @@ Additional CLI commands for Yahoo Finance downloader
 
 import click
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from datetime import date, datetime
 from pathlib import Path
+import os
 import sys
-from typing import List
+import tempfile
+from typing import List, Optional
 
 # Add the parent directory to the path to import core modules
 sys.path.append(str(Path(__file__).parent.parent))
 
 from core.processor import DataProcessor
-from core.utils import merge_csv_files, get_file_size, format_file_size
+from core.utils import DOWNCAST_COLUMNS, merge_csv_files, get_file_size, format_file_size, write_json, write_parquet
+
+try:
+    import polars as pl
+    from core.processor_polars import calculate_returns_pl, resample_data_pl, validate_data_pl
+except ImportError:  # polars is optional, fall back to pandas
+    pl = None
+
+try:
+    from core.summary_duckdb import summary_via_duckdb
+except ImportError:  # duckdb is optional, fall back to pandas
+    summary_via_duckdb = None
+
+
+def _read_any(path: str) -> pd.DataFrame:
+    """
+    Read a data file into a DataFrame using the multi-threaded pyarrow readers
+    
+    Args:
+        path: Path to a csv, parquet or json file, or a parquet dataset directory
+        
+    Returns:
+        DataFrame with the file contents
+    """
+    if path.endswith('.csv'):
+        table = pa_csv.read_csv(
+            path,
+            read_options=pa_csv.ReadOptions(block_size=8 << 20, use_threads=True),
+            convert_options=pa_csv.ConvertOptions(timestamp_parsers=['%Y-%m-%d'])
+        )
+    elif path.endswith('.json'):
+        # pyarrow only reads newline-delimited JSON, our files are arrays of records
+        return pd.read_json(path)
+    elif os.path.isdir(path):
+        table = _read_dataset(path)
+    else:
+        table = pq.read_table(path)
+    
+    # Parquet stores dates as date32, which would otherwise become date objects
+    return table.to_pandas(self_destruct=True, split_blocks=True, date_as_object=False)
+
+
+def _read_dataset(path: str) -> pa.Table:
+    """
+    Read a hive partitioned parquet dataset whose files may differ in column types
+    
+    Files saved with and without downcasting store prices as float32 and
+    float64. pyarrow would cast every file to the types of the first one, so
+    the file schemas are unified to the widest types first.
+    
+    Args:
+        path: Path to a parquet dataset directory
+        
+    Returns:
+        Arrow table with the rows of all files and the partition columns
+    """
+    partitioning = ds.HivePartitioning.discover(infer_dictionary=True)
+    dataset = ds.dataset(path, format='parquet', partitioning=partitioning)
+    schemas = [fragment.physical_schema for fragment in dataset.get_fragments()]
+    schema = pa.unify_schemas(schemas + [dataset.schema], promote_options='permissive')
+    return ds.dataset(path, schema=schema, format='parquet', partitioning=partitioning).to_table()
+
+
+def _sink_pl(lf, output_file: str, output_format: str):
+    """
+    Stream a polars LazyFrame into a csv or parquet file
+    
+    The output goes to a temporary file next to output_file, which replaces
+    it only once it is complete, so a failed merge leaves no partial file.
+    
+    Args:
+        lf: LazyFrame to write
+        output_file: Output file path
+        output_format: csv or parquet
+    """
+    output_path = Path(output_file)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{output_path.name}.", dir=output_path.parent)
+    os.close(fd)
+    try:
+        if output_format == 'csv':
+            lf.sink_csv(tmp_name)
+        else:
+            lf.sink_parquet(tmp_name)
+        os.replace(tmp_name, output_path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def _read_parquet_date_range(path: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """
+    Read the rows of a parquet file within a date range
+    
+    The filter is applied by the parquet reader, so row groups outside the
+    range are skipped without being decoded.
+    
+    Args:
+        path: Path to a parquet file
+        start_date: Start date in YYYY-MM-DD format
+        end_date: End date in YYYY-MM-DD format
+        
+    Returns:
+        DataFrame with the rows between start_date and end_date (inclusive)
+    """
+    # Match the bounds to the stored type of the date column
+    date_type = pq.read_schema(path).field('date').type
+    if pa.types.is_timestamp(date_type):
+        start, end = pd.Timestamp(start_date, tz=date_type.tz), pd.Timestamp(end_date, tz=date_type.tz)
+    elif pa.types.is_date(date_type):
+        start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    else:
+        start, end = start_date, end_date
+    
+    table = pq.read_table(path, filters=[('date', '>=', start), ('date', '<=', end)])
+    return table.to_pandas(self_destruct=True, split_blocks=True, date_as_object=False)
 
 
 @click.group()
@@ -35,7 +156,8 @@ def merge(input_dir, output_file, remove_duplicates, output_format):
     if output_format == 'csv':
         files = list(input_path.glob("*.csv"))
     elif output_format == 'parquet':
-        files = list(input_path.glob("*.parquet"))
+        # Parquet downloads are a dataset partitioned into ticker=XYZ/ directories
+        files = list(input_path.rglob("*.parquet"))
     elif output_format == 'json':
         files = list(input_path.glob("*.json"))
     
@@ -46,36 +168,60 @@ def merge(input_dir, output_file, remove_duplicates, output_format):
     click.echo(f"Found {len(files)} files to merge")
     
     # Merge files
-    if output_format == 'csv':
+    merged = False
+    if pl is not None and output_format in ('csv', 'parquet'):
+        # Lazy scans stream the inputs instead of holding every file in memory
+        try:
+            if output_format == 'csv':
+                lf = pl.concat([pl.scan_csv(f) for f in files], how='diagonal_relaxed')
+            else:
+                lf = pl.scan_parquet(str(input_path / "**" / "*.parquet"), hive_partitioning=True)
+            
+            if remove_duplicates:
+                lf = lf.unique(maintain_order=True)
+            
+            _sink_pl(lf, output_file, output_format)
+            merged = True
+        except Exception as e:
+            # Such as files whose column types differ, which pyarrow unifies
+            click.echo(f"Could not merge with polars, falling back to pyarrow: {str(e)}")
+    
+    if merged:
+        success = True
+    elif output_format == 'csv':
         success = merge_csv_files([str(f) for f in files], output_file, remove_duplicates)
     else:
         # For non-CSV formats, we'll use pandas
         all_data = []
-        for file in files:
+        if output_format == 'parquet':
+            # Read the dataset as a whole so the ticker partition column is restored
             try:
-                if output_format == 'parquet':
-                    df = pd.read_parquet(file)
-                elif output_format == 'json':
-                    df = pd.read_json(file)
-                all_data.append(df)
+                all_data.append(_read_any(input_dir))
             except Exception as e:
-                click.echo(f"Error reading {file}: {str(e)}")
-                continue
+                click.echo(f"Error reading {input_dir}: {str(e)}")
+        else:
+            for file in files:
+                try:
+                    df = _read_any(str(file))
+                    all_data.append(df)
+                except Exception as e:
+                    click.echo(f"Error reading {file}: {str(e)}")
+                    continue
         
         if not all_data:
             click.echo("No valid data to merge")
             return
         
-        merged_df = pd.concat(all_data, ignore_index=True)
+        merged_df = DataProcessor.concat_frames(all_data)
         
         if remove_duplicates:
             merged_df = merged_df.drop_duplicates()
         
         try:
             if output_format == 'parquet':
-                merged_df.to_parquet(output_file, index=False)
+                write_parquet(merged_df, output_file)
             elif output_format == 'json':
-                merged_df.to_json(output_file, orient='records', date_format='iso')
+                write_json(merged_df, output_file)
             success = True
         except Exception as e:
             click.echo(f"Error saving merged data: {str(e)}")
@@ -89,6 +235,39 @@ def merge(input_dir, output_file, remove_duplicates, output_format):
         click.echo("Failed to merge files")
 
 
+def _process_pl(
+    df: "pl.DataFrame",
+    validate: bool,
+    returns: bool,
+    resample: Optional[str]
+) -> pd.DataFrame:
+    """
+    Run the process steps with polars and hand the result to pandas
+    
+    Args:
+        df: Polars DataFrame with OHLCV data
+        validate: Validate and clean data
+        returns: Calculate returns
+        resample: Resample frequency, if any
+        
+    Returns:
+        Processed DataFrame
+    """
+    if validate:
+        df = validate_data_pl(df)
+        click.echo("Data validated and cleaned")
+    
+    if returns:
+        df = calculate_returns_pl(df)
+        click.echo("Returns calculated")
+    
+    if resample:
+        df = resample_data_pl(df, resample)
+        click.echo(f"Data resampled to {resample} frequency")
+    
+    return df.to_pandas()
+
+
 @data.command()
 @click.argument('input_file', type=click.Path(exists=True))
 @click.option('--add-indicators', is_flag=True, help='Add technical indicators')
@@ -96,20 +275,30 @@ def merge(input_dir, output_file, remove_duplicates, output_format):
 @click.option('--returns', is_flag=True, help='Calculate returns')
 @click.option('--resample', help='Resample frequency (D, W, M)')
 @click.option('--output', help='Output file path (default: overwrite input)')
-def process(input_file, add_indicators, validate, returns, resample, output):
+@click.option('--downcast/--no-downcast', default=True, help='Store prices as float32, about 7 significant digits (default: on)')
+@click.option('--fast/--no-fast', default=None, help='Process with polars when installed (default: on for parquet inputs)')
+def process(input_file, add_indicators, validate, returns, resample, output, downcast, fast):
     """Process and analyze downloaded data"""
     
     # Read input file
+    if not input_file.endswith(('.csv', '.parquet', '.json')):
+        click.echo(f"Unsupported file format: {input_file}")
+        return
+    
+    if fast is None:
+        fast = input_file.endswith('.parquet')
+    
+    # Technical indicators use the numpy kernels, so those runs stay in pandas
+    use_polars = fast and pl is not None and not add_indicators and not input_file.endswith('.json')
+    
     try:
-        if input_file.endswith('.csv'):
-            df = pd.read_csv(input_file)
-        elif input_file.endswith('.parquet'):
-            df = pd.read_parquet(input_file)
-        elif input_file.endswith('.json'):
-            df = pd.read_json(input_file)
+        if use_polars:
+            if input_file.endswith('.parquet'):
+                df = pl.read_parquet(input_file)
+            else:
+                df = pl.read_csv(input_file, try_parse_dates=True)
         else:
-            click.echo(f"Unsupported file format: {input_file}")
-            return
+            df = _read_any(input_file)
     except Exception as e:
         click.echo(f"Error reading file {input_file}: {str(e)}")
         return
@@ -118,33 +307,41 @@ def process(input_file, add_indicators, validate, returns, resample, output):
     
     # Initialize processor
     processor = DataProcessor()
+    output_file = output or input_file
     
     # Process data
-    if validate:
-        df = processor.validate_data(df)
-        click.echo("Data validated and cleaned")
-    
-    if add_indicators:
-        df = processor.add_technical_indicators(df)
-        click.echo("Technical indicators added")
-    
-    if returns:
-        df = processor.calculate_returns(df)
-        click.echo("Returns calculated")
+    if use_polars:
+        df = _process_pl(df, validate, returns, resample)
+    else:
+        if validate:
+            df = processor.validate_data(df)
+            click.echo("Data validated and cleaned")
+        
+        if add_indicators:
+            df = processor.add_technical_indicators(df)
+            click.echo("Technical indicators added")
+        
+        if returns:
+            df = processor.calculate_returns(df)
+            click.echo("Returns calculated")
+        
+        if resample:
+            df = processor.resample_data(df, resample)
+            click.echo(f"Data resampled to {resample} frequency")
     
-    if resample:
-        df = processor.resample_data(df, resample)
-        click.echo(f"Data resampled to {resample} frequency")
+    # Downcast last and only the raw prices, so indicators and returns come from
+    # the full precision prices and stay float64 in both paths
+    if downcast and not output_file.endswith('.json'):
+        df = processor.downcast_data(df, list(DOWNCAST_COLUMNS))
     
     # Save processed data
-    output_file = output or input_file
     try:
         if output_file.endswith('.csv'):
             df.to_csv(output_file, index=False)
         elif output_file.endswith('.parquet'):
-            df.to_parquet(output_file, index=False)
+            write_parquet(df, output_file)
         elif output_file.endswith('.json'):
-            df.to_json(output_file, orient='records', date_format='iso')
+            write_json(df, output_file)
         
         click.echo(f"Processed data saved to {output_file}")
     except Exception as e:
@@ -156,25 +353,20 @@ def process(input_file, add_indicators, validate, returns, resample, output):
 def summary(input_file):
     """Show summary statistics for data file"""
     
-    # Read input file
+    if not input_file.endswith(('.csv', '.parquet', '.json')):
+        click.echo(f"Unsupported file format: {input_file}")
+        return
+    
     try:
-        if input_file.endswith('.csv'):
-            df = pd.read_csv(input_file)
-        elif input_file.endswith('.parquet'):
-            df = pd.read_parquet(input_file)
-        elif input_file.endswith('.json'):
-            df = pd.read_json(input_file)
+        if summary_via_duckdb is not None and not input_file.endswith('.json'):
+            # Aggregate in DuckDB without materializing the file
+            summary = summary_via_duckdb(input_file)
         else:
-            click.echo(f"Unsupported file format: {input_file}")
-            return
+            summary = DataProcessor.get_data_summary(_read_any(input_file))
     except Exception as e:
         click.echo(f"Error reading file {input_file}: {str(e)}")
         return
     
-    # Get summary
-    processor = DataProcessor()
-    summary = processor.get_data_summary(df)
-    
     if summary:
         click.echo(f"\nSummary for {input_file}:")
         click.echo(f"Total records: {summary['total_records']:,}")
@@ -200,36 +392,53 @@ def filter(input_file, start_date, end_date, output):
         click.echo("Both --start-date and --end-date are required")
         return
     
-    # Read input file
+    if not input_file.endswith(('.csv', '.parquet', '.json')):
+        click.echo(f"Unsupported file format: {input_file}")
+        return
+    
+    output_file = output or f"filtered_{Path(input_file).name}"
+    
+    # Stream CSV to CSV through polars without materializing the input
+    if pl is not None and input_file.endswith('.csv') and output_file.endswith('.csv'):
+        try:
+            in_range = pl.col('date').cast(pl.Datetime).is_between(
+                datetime.fromisoformat(start_date), datetime.fromisoformat(end_date)
+            )
+            lf = pl.scan_csv(input_file, try_parse_dates=True)
+            
+            # Counting only needs the date column, so this scan is cheap
+            total_rows, kept_rows = lf.select(pl.len(), in_range.sum()).collect().row(0)
+            click.echo(f"Filtered {total_rows} rows to {kept_rows} rows")
+            
+            lf.filter(in_range).sink_csv(output_file)
+            click.echo(f"Filtered data saved to {output_file}")
+        except Exception as e:
+            click.echo(f"Error filtering file {input_file}: {str(e)}")
+        return
+    
+    # Read input file, pushing the date filter into the parquet reader
     try:
-        if input_file.endswith('.csv'):
-            df = pd.read_csv(input_file)
-        elif input_file.endswith('.parquet'):
-            df = pd.read_parquet(input_file)
-        elif input_file.endswith('.json'):
-            df = pd.read_json(input_file)
+        if input_file.endswith('.parquet'):
+            total_rows = pq.ParquetFile(input_file).metadata.num_rows
+            filtered_df = _read_parquet_date_range(input_file, start_date, end_date)
         else:
-            click.echo(f"Unsupported file format: {input_file}")
-            return
+            df = _read_any(input_file)
+            total_rows = len(df)
+            filtered_df = DataProcessor.filter_by_date_range(df, start_date, end_date)
     except Exception as e:
         click.echo(f"Error reading file {input_file}: {str(e)}")
         return
     
-    # Filter data
-    processor = DataProcessor()
-    filtered_df = processor.filter_by_date_range(df, start_date, end_date)
-    
-    click.echo(f"Filtered {len(df)} rows to {len(filtered_df)} rows")
+    click.echo(f"Filtered {total_rows} rows to {len(filtered_df)} rows")
     
     # Save filtered data
-    output_file = output or f"filtered_{Path(input_file).name}"
     try:
         if output_file.endswith('.csv'):
             filtered_df.to_csv(output_file, index=False)
         elif output_file.endswith('.parquet'):
-            filtered_df.to_parquet(output_file, index=False)
+            write_parquet(filtered_df, output_file)
         elif output_file.endswith('.json'):
-            filtered_df.to_json(output_file, orient='records', date_format='iso')
+            write_json(filtered_df, output_file)
         
         click.echo(f"Filtered data saved to {output_file}")
     except Exception as e:
@@ -4,9 +4,11 @@ Main CLI entry point for Yahoo Finance downloader
 
 import click
 import sys
+from functools import partial
 from pathlib import Path
+import pandas as pd
 import logging
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 
 # Add the parent directory to the path to import core modules
 sys.path.append(str(Path(__file__).parent.parent))
@@ -28,6 +30,103 @@ from core.utils import (
 logger = logging.getLogger(__name__)
 
 
+def _process_one(ticker: str, df: pd.DataFrame, validate: bool, add_indicators: bool) -> pd.DataFrame:
+    """
+    Validate and add indicators to one ticker's downloaded data
+    
+    Defined at module level so the downloader can run it in worker processes.
+    
+    Args:
+        ticker: Stock ticker symbol
+        df: Downloaded DataFrame
+        validate: Whether to validate and clean the data
+        add_indicators: Whether to add technical indicators
+        
+    Returns:
+        Processed DataFrame
+    """
+    if validate:
+        df = DataProcessor.validate_data(df)
+    if add_indicators:
+        df = DataProcessor.add_technical_indicators(df)
+    return df
+
+
+def _iter_tickers(
+    tickers: Optional[str],
+    ticker_file: Optional[str],
+    country: Optional[str],
+    countries: Optional[str]
+) -> Iterator[str]:
+    """
+    Yield normalized ticker symbols from all ticker sources
+    
+    Args:
+        tickers: Comma-separated list of ticker symbols
+        ticker_file: File containing ticker symbols
+        country: Country code
+        countries: Comma-separated list of country codes
+        
+    Yields:
+        Upper-case ticker symbols, possibly with duplicates
+    """
+    sources = []
+    if tickers:
+        sources.append(parse_ticker_list(tickers))
+    
+    if ticker_file:
+        file_tickers = load_tickers_from_file(ticker_file)
+        if not file_tickers:
+            click.echo(f"Warning: No tickers found in file {ticker_file}")
+        sources.append(file_tickers)
+    
+    for c in ([country] if country else []) + parse_ticker_list(countries):
+        country_tickers = get_country_tickers(c)
+        if not country_tickers:
+            click.echo(f"Warning: No tickers found for country {c}")
+        sources.append(country_tickers)
+    
+    for source in sources:
+        for ticker in source:
+            ticker = ticker.strip()
+            if ticker:
+                yield ticker.upper()
+
+
+def _resolve_dates(start_date: Optional[str], end_date: Optional[str], days: int) -> Tuple[str, str]:
+    """
+    Validate the given dates and fill in missing ones from the look-back window
+    
+    Exits with an error message if a date or the date range is invalid.
+    
+    Args:
+        start_date: Start date in YYYY-MM-DD format, or None
+        end_date: End date in YYYY-MM-DD format, or None
+        days: Number of days to look back when a date is missing
+        
+    Returns:
+        Tuple of (start_date, end_date) in YYYY-MM-DD format
+    """
+    if start_date and not validate_date_format(start_date):
+        click.echo(f"Error: Invalid start date format: {start_date}. Use YYYY-MM-DD")
+        sys.exit(1)
+    
+    if end_date and not validate_date_format(end_date):
+        click.echo(f"Error: Invalid end date format: {end_date}. Use YYYY-MM-DD")
+        sys.exit(1)
+    
+    if start_date and end_date and not validate_date_range(start_date, end_date):
+        click.echo(f"Error: Invalid date range. Start date must be before end date.")
+        sys.exit(1)
+    
+    if not start_date or not end_date:
+        default_start, default_end = get_default_date_range(days)
+        start_date = start_date or default_start
+        end_date = end_date or default_end
+    
+    return start_date, end_date
+
+
 @click.group()
 @click.option('--log-level', default='INFO', help='Logging level (DEBUG, INFO, WARNING, ERROR)')
 @click.option('--log-file', help='Log file path')
@@ -50,52 +149,27 @@ def cli(ctx, log_level, log_file):
 @click.option('--days', default=365, help='Number of days to look back (default: 365)')
 @click.option('--period', help='Period to download (e.g., max, 1y, 5y, 10y) - overrides start/end dates')
 @click.option('--output-dir', default='data/downloads', help='Output directory (default: data/downloads)')
-@click.option('--format', 'output_format', default='csv', type=click.Choice(['csv', 'parquet', 'json']), help='Output format')
+@click.option('--format', 'output_format', default='parquet', type=click.Choice(['csv', 'parquet', 'json']), help='Output format (default: parquet, zstd-compressed)')
 @click.option('--concurrency', default=50, help='Maximum concurrent downloads (default: 50)')
 @click.option('--retry', default=3, help='Retry attempts (default: 3)')
 @click.option('--timeout', default=30, help='Request timeout in seconds (default: 30)')
 @click.option('--add-indicators', is_flag=True, help='Add technical indicators')
 @click.option('--validate', is_flag=True, help='Validate and clean data')
 @click.option('--no-adjust', is_flag=True, default=False, help='Download unadjusted (raw) prices instead of adjusted prices')
+@click.option('--downcast/--no-downcast', default=True, help='Store prices as float32, about 7 significant digits (default: on)')
 @click.pass_context
 def download(ctx, tickers, ticker_file, country, countries, start_date, end_date, days, period,
-             output_dir, output_format, concurrency, retry, timeout, add_indicators, validate, no_adjust):
+             output_dir, output_format, concurrency, retry, timeout, add_indicators, validate, no_adjust,
+             downcast):
     """Download OHLCV data for specified tickers"""
     
-    # Validate and parse tickers
-    ticker_list = []
-    
-    if tickers:
-        ticker_list.extend(parse_ticker_list(tickers))
-    
-    if ticker_file:
-        file_tickers = load_tickers_from_file(ticker_file)
-        if file_tickers:
-            ticker_list.extend(file_tickers)
-        else:
-            click.echo(f"Warning: No tickers found in file {ticker_file}")
-    
-    if country:
-        country_tickers = get_country_tickers(country)
-        if country_tickers:
-            ticker_list.extend(country_tickers)
-        else:
-            click.echo(f"Warning: No tickers found for country {country}")
-    
-    if countries:
-        for c in parse_ticker_list(countries):
-            country_tickers = get_country_tickers(c)
-            if country_tickers:
-                ticker_list.extend(country_tickers)
-            else:
-                click.echo(f"Warning: No tickers found for country {c}")
+    # Collect tickers from all sources, removing duplicates but keeping the input order
+    ticker_list = list(dict.fromkeys(_iter_tickers(tickers, ticker_file, country, countries)))
     
     if not ticker_list:
         click.echo("Error: No tickers specified. Use --tickers, --file, --country, or --countries")
         sys.exit(1)
     
-    # Remove duplicates
-    ticker_list = list(set(ticker_list))
     click.echo(f"Downloading data for {len(ticker_list)} tickers")
     
     # Handle period parameter
@@ -106,24 +180,7 @@ def download(ctx, tickers, ticker_file, country, countries, start_date, end_date
         start_date = None  # Not used when period is specified
         end_date = None    # Not used when period is specified
     else:
-        # Validate and set date range
-        if start_date and not validate_date_format(start_date):
-            click.echo(f"Error: Invalid start date format: {start_date}. Use YYYY-MM-DD")
-            sys.exit(1)
-        
-        if end_date and not validate_date_format(end_date):
-            click.echo(f"Error: Invalid end date format: {end_date}. Use YYYY-MM-DD")
-            sys.exit(1)
-        
-        if start_date and end_date and not validate_date_range(start_date, end_date):
-            click.echo(f"Error: Invalid date range. Start date must be before end date.")
-            sys.exit(1)
-        
-        if not start_date or not end_date:
-            default_start, default_end = get_default_date_range(days)
-            start_date = start_date or default_start
-            end_date = end_date or default_end
-        
+        start_date, end_date = _resolve_dates(start_date, end_date, days)
         click.echo(f"Date range: {start_date} to {end_date}")
     
     # Create output directory
@@ -136,59 +193,30 @@ def download(ctx, tickers, ticker_file, country, countries, start_date, end_date
     click.echo(f"Estimated download time: {format_time(estimated_time)} (concurrency: {concurrency})")
     click.echo("Note: Actual time may vary based on network conditions and API rate limits")
     
-    # Initialize downloader
-    downloader = ParallelDownloader(
-        max_concurrent=concurrency,
-        retry_attempts=retry,
-        timeout=timeout
-    )
+    # Process data in memory before it is saved, if requested
+    post_process = None
+    if add_indicators or validate:
+        post_process = partial(_process_one, validate=validate, add_indicators=add_indicators)
     
-    # Download data
+    # Download data; the downloader's connections are closed even if it fails
     click.echo("Starting download...")
     auto_adjust = not no_adjust  # Convert no_adjust flag to auto_adjust boolean
-    results = downloader.download_sync(
-        tickers=ticker_list,
-        start_date=start_date,
-        end_date=end_date,
-        output_dir=output_dir,
-        output_format=output_format,
-        period=period,
-        auto_adjust=auto_adjust
-    )
-    
-    # Process data if requested
-    if add_indicators or validate:
-        click.echo("Processing downloaded data...")
-        processor = DataProcessor()
-        
-        for ticker in results['successful_tickers']:
-            try:
-                filename = f"{ticker}_{start_date}_{end_date}.{output_format}"
-                filepath = Path(output_dir) / filename
-                
-                if output_format == 'csv':
-                    df = pd.read_csv(filepath)
-                elif output_format == 'parquet':
-                    df = pd.read_parquet(filepath)
-                elif output_format == 'json':
-                    df = pd.read_json(filepath)
-                
-                if validate:
-                    df = processor.validate_data(df)
-                
-                if add_indicators:
-                    df = processor.add_technical_indicators(df)
-                
-                # Save processed data
-                if output_format == 'csv':
-                    df.to_csv(filepath, index=False)
-                elif output_format == 'parquet':
-                    df.to_parquet(filepath, index=False)
-                elif output_format == 'json':
-                    df.to_json(filepath, orient='records', date_format='iso')
-                    
-            except Exception as e:
-                logger.error(f"Error processing data for {ticker}: {str(e)}")
+    with ParallelDownloader(
+        max_concurrent=concurrency,
+        retry_attempts=retry,
+        timeout=timeout
+    ) as downloader:
+        results = downloader.download_sync(
+            tickers=ticker_list,
+            start_date=start_date,
+            end_date=end_date,
+            output_dir=output_dir,
+            output_format=output_format,
+            period=period,
+            auto_adjust=auto_adjust,
+            post_process=post_process,
+            downcast=downcast
+        )
     
     # Print results
     click.echo(f"\nDownload completed!")
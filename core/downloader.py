@@ -4,19 +4,45 @@ Parallel Yahoo Finance data downloader
 
 import asyncio
 import aiohttp
-import yfinance as yf
+import functools
+from concurrent.futures import ProcessPoolExecutor
+import os
+import pickle
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Optional, Union
-from datetime import datetime, timedelta
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
+from typing import Callable, List, Dict, Optional, Tuple, Union
+from datetime import datetime, timedelta, timezone
 import logging
 from pathlib import Path
 import time
+from urllib.parse import quote
 from tqdm.asyncio import tqdm
 
+from core.processor import DataProcessor
+from core.utils import PARQUET_WRITE_OPTIONS, chunk_ndarray, to_arrow_table, write_json
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Yahoo's chart endpoint, which serves the daily history of one symbol
+CHART_URL = "https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
+
+# Yahoo rejects requests that do not look like they come from a browser
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                  '(KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36'
+}
+
+# Price columns rounded to 4 decimals for better readability
+PRICE_COLUMNS = ('open', 'high', 'low', 'close')
+
+# Yahoo's batched quote endpoint and the most symbols it serves per request
+QUOTE_URL = "https://query1.finance.yahoo.com/v7/finance/quote"
+QUOTE_BATCH_SIZE = 200
+
 
 class ParallelDownloader:
     """High-performance parallel Yahoo Finance data downloader"""
@@ -41,96 +67,205 @@ class ParallelDownloader:
         self.retry_attempts = retry_attempts
         self.retry_delay = retry_delay
         self.timeout = timeout
-        self.semaphore = asyncio.Semaphore(max_concurrent)
         
-    async def download_ticker(
-        self,
-        ticker: str,
+        # Shared across download_sync calls so connections, DNS lookups and
+        # TLS sessions are reused; the session belongs to this loop
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def _new_session(self) -> aiohttp.ClientSession:
+        """
+        Create an HTTP session with a pooled, DNS-caching connector
+        
+        Returns:
+            aiohttp session
+        """
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=self.max_concurrent,
+                limit_per_host=self.max_concurrent,
+                use_dns_cache=True,
+                ttl_dns_cache=600,
+                keepalive_timeout=75
+            ),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers=REQUEST_HEADERS
+        )
+    
+    def close(self):
+        """Close the shared HTTP session and the event loop used by download_sync"""
+        if self._loop is not None and not self._loop.is_closed():
+            if self._session is not None:
+                self._loop.run_until_complete(self._session.close())
+            self._loop.run_until_complete(self._loop.shutdown_default_executor())
+            self._loop.close()
+        self._loop = None
+        self._session = None
+    
+    @staticmethod
+    def _chart_params(
         start_date: str,
         end_date: str,
+        period: Optional[str] = None
+    ) -> Dict[str, str]:
+        """
+        Build the chart endpoint query parameters
+        
+        Args:
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format (exclusive)
+            period: Period parameter (e.g., "max", "1y", "5y") - if provided, ignores start/end dates
+            
+        Returns:
+            Dictionary with query parameters
+        """
+        params = {
+            'interval': '1d',
+            'events': 'div,splits',
+            'includeAdjustedClose': 'true'
+        }
+        
+        if period:
+            params['range'] = period
+        else:
+            # Convert the dates to unix timestamps once for all tickers
+            for key, date_str in (('period1', start_date), ('period2', end_date)):
+                date = datetime.strptime(date_str, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+                params[key] = str(int(date.timestamp()))
+        
+        return params
+    
+    async def _fetch_chart_json(
+        self,
         session: aiohttp.ClientSession,
-        period: Optional[str] = None,
+        semaphore: asyncio.Semaphore,
+        symbol: str,
+        params: Dict[str, str]
+    ) -> Optional[Dict]:
+        """
+        Fetch the chart JSON for a single ticker
+        
+        Args:
+            session: aiohttp session
+            semaphore: Semaphore limiting the number of concurrent requests
+            symbol: Stock ticker symbol
+            params: Chart endpoint query parameters
+            
+        Returns:
+            Decoded JSON response or None if the request failed
+        """
+        url = CHART_URL.format(symbol=quote(symbol, safe=''))
+        async with semaphore:
+            try:
+                async with session.get(url, params=params) as response:
+                    response.raise_for_status()
+                    return await response.json()
+            except Exception as e:
+                logger.debug(f"Download failed for {symbol}: {str(e)}")
+                return None
+    
+    async def download_ticker(
+        self,
+        session: aiohttp.ClientSession,
+        semaphore: asyncio.Semaphore,
+        symbol: str,
+        params: Dict[str, str],
         auto_adjust: bool = True
-    ) -> Optional[pd.DataFrame]:
+    ) -> Tuple[str, Optional[pd.DataFrame]]:
         """
-        Download data for a single ticker with retry logic
+        Download data for a single ticker
         
         Args:
-            ticker: Stock ticker symbol
-            start_date: Start date in YYYY-MM-DD format
-            end_date: End date in YYYY-MM-DD format
             session: aiohttp session
-            period: Period parameter (e.g., "max", "1y", "5y") - if provided, ignores start/end dates
+            semaphore: Semaphore limiting the number of concurrent requests
+            symbol: Stock ticker symbol
+            params: Chart endpoint query parameters
+            auto_adjust: Whether to adjust prices for splits and dividends
             
         Returns:
-            DataFrame with OHLCV data or None if failed
+            Tuple of the ticker symbol and its DataFrame with OHLCV data,
+            or None if the download failed or returned no data
         """
-        # Extract ticker symbol for display
-        ticker_parts = ticker.split(',')
-        ticker_symbol = ticker_parts[0].strip()
-        ticker_name = ticker_parts[1].strip() if len(ticker_parts) > 1 else ""
+        chart = await self._fetch_chart_json(session, semaphore, symbol, params)
+        if chart is None:
+            return symbol, None
         
-        async with self.semaphore:
-            for attempt in range(self.retry_attempts):
-                try:
-                    # Use yfinance to download data
-                    stock = yf.Ticker(ticker_symbol)
-                    
-                    # Use period if provided, otherwise use start/end dates
-                    if period:
-                        data = stock.history(
-                            period=period,
-                            auto_adjust=auto_adjust,
-                            prepost=False
-                        )
-                    else:
-                        data = stock.history(
-                            start=start_date,
-                            end=end_date,
-                            auto_adjust=auto_adjust,
-                            prepost=False
-                        )
-                    
-                    if data.empty:
-                        logger.warning(f"No data found for ticker: {ticker_symbol} ({ticker_name})")
-                        return None
-                    
-                    # Add ticker column - use only the ticker symbol
-                    data['ticker'] = ticker_parts[0].strip()
-                    data.reset_index(inplace=True)
-                    
-                    # Rename columns to standard format
-                    data.rename(columns={
-                        'Date': 'date',
-                        'Open': 'open',
-                        'High': 'high',
-                        'Low': 'low',
-                        'Close': 'close',
-                        'Volume': 'volume',
-                        'Dividends': 'dividends',
-                        'Stock Splits': 'stock_splits'
-                    }, inplace=True)
-                    
-                    # Format numeric columns for better readability
-                    numeric_columns = ['open', 'high', 'low', 'close']
-                    for col in numeric_columns:
-                        if col in data.columns:
-                            data[col] = data[col].round(4)
-                    
-                    # Format date column to remove time component if present
-                    if 'date' in data.columns:
-                        data['date'] = pd.to_datetime(data['date']).dt.strftime('%Y-%m-%d')
-                    
-                    return data
-                    
-                except Exception as e:
-                    display_name = f"{ticker_symbol} ({ticker_name})" if ticker_name else ticker_symbol
-                    logger.warning(f"Attempt {attempt + 1} failed for {display_name}: {str(e)}")
-                    if attempt < self.retry_attempts - 1:
-                        await asyncio.sleep(self.retry_delay * (2 ** attempt))
-                    else:
-                        logger.error(f"Failed to download data for {display_name} after {self.retry_attempts} attempts")
-                        return None
+        try:
+            return symbol, self._parse_chart(chart['chart']['result'][0], symbol, auto_adjust)
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            logger.debug(f"Unexpected chart response for {symbol}: {str(e)}")
+            return symbol, None
+    
+    @staticmethod
+    def _parse_chart(
+        result: Dict,
+        ticker_symbol: str,
+        auto_adjust: bool = True
+    ) -> Optional[pd.DataFrame]:
+        """
+        Convert a chart endpoint result to the standard format
+        
+        Args:
+            result: Chart result for a single ticker
+            ticker_symbol: Stock ticker symbol
+            auto_adjust: Whether to adjust prices for splits and dividends
+            
+        Returns:
+            DataFrame with standard column names, or None if there is no data
+        """
+        timestamps = np.asarray(result.get('timestamp') or [], dtype=np.int64)
+        if len(timestamps) == 0:
+            return None
+        
+        # The quote arrays hold null for missing values, which become NaN
+        quote = result['indicators']['quote'][0]
+        prices = {col: np.asarray(quote[col], dtype=np.float64) for col in PRICE_COLUMNS}
+        volume = np.asarray(quote['volume'], dtype=np.float64)
+        adjclose = result['indicators'].get('adjclose')
+        adj_close = np.asarray(adjclose[0]['adjclose'], dtype=np.float64) if adjclose else prices['close']
+        
+        if auto_adjust:
+            # Scale all prices by the adjusted to unadjusted close ratio, like yfinance
+            ratio = adj_close / prices['close']
+            for col in ('open', 'high', 'low'):
+                prices[col] = prices[col] * ratio
+            prices['close'] = adj_close
+        
+        # Skip the placeholder bars Yahoo returns for days without trading
+        keep = ~np.all(np.isnan(np.vstack(list(prices.values()))), axis=0)
+        if not keep.any():
+            return None
+        
+        # Bars are stamped at the market open, so the exchange's local date is the trading day
+        timezone_name = result['meta'].get('exchangeTimezoneName') or 'UTC'
+        dates = pd.to_datetime(timestamps[keep], unit='s', utc=True).tz_convert(timezone_name)
+        dates = dates.tz_localize(None).normalize()
+        
+        events = result.get('events') or {}
+        dividends = _event_values(timestamps, events.get('dividends'), lambda event: event['amount'])
+        splits = _event_values(
+            timestamps, events.get('splits'), lambda event: event['numerator'] / event['denominator']
+        )
+        
+        columns = {'date': dates.to_numpy()}
+        for col in PRICE_COLUMNS:
+            columns[col] = prices[col][keep].round(4)
+        if not auto_adjust:
+            columns['adj_close'] = adj_close[keep]
+        columns['volume'] = np.nan_to_num(volume[keep]).astype(np.int64)
+        columns['dividends'] = dividends[keep]
+        columns['stock_splits'] = splits[keep]
+        columns['ticker'] = pd.Categorical.from_codes(
+            np.zeros(keep.sum(), dtype=np.int32), [ticker_symbol]
+        )
+        
+        return pd.DataFrame(columns)
     
     async def download_tickers(
         self,
@@ -138,19 +273,26 @@ class ParallelDownloader:
         start_date: str,
         end_date: str,
         output_dir: str = "data/downloads",
-        output_format: str = "csv",
+        output_format: str = "parquet",
         period: Optional[str] = None,
-        auto_adjust: bool = True
+        auto_adjust: bool = True,
+        post_process: Optional[Callable[[str, pd.DataFrame], pd.DataFrame]] = None,
+        downcast: bool = True
     ) -> Dict[str, Union[int, List[str]]]:
         """
         Download data for multiple tickers in parallel
         
+        Each ticker's history is fetched from Yahoo's chart endpoint, with up
+        to max_concurrent requests in flight.
+        
         Args:
             tickers: List of ticker symbols
             start_date: Start date in YYYY-MM-DD format
             end_date: End date in YYYY-MM-DD format
             output_dir: Directory to save downloaded data
             output_format: Output format (csv, parquet, json)
+            post_process: Optional callable applied to each (ticker, DataFrame) before saving
+            downcast: Whether to store prices as float32 (not applied to json)
             
         Returns:
             Dictionary with download statistics
@@ -158,55 +300,130 @@ class ParallelDownloader:
         # Create output directory
         Path(output_dir).mkdir(parents=True, exist_ok=True)
         
-        # Create aiohttp session
-        connector = aiohttp.TCPConnector(limit=self.max_concurrent)
-        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        # Parse the ticker,name format once into (symbol, name) pairs
+        parsed_tickers = {ticker: _parse_ticker(ticker) for ticker in tickers}
+        pending = list(dict.fromkeys(symbol for symbol, _ in parsed_tickers.values()))
         
-        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
-            # Create progress bar
-            pbar = tqdm(total=len(tickers), desc="Downloading tickers")
-            
-            # Create tasks for all tickers
-            tasks = []
-            for ticker in tickers:
-                task = self.download_ticker(ticker, start_date, end_date, session, period, auto_adjust)
-                # Extract ticker symbol for filename
-                ticker_symbol = ticker.split(',')[0].strip() if ',' in ticker else ticker
-                tasks.append((ticker, task, ticker_symbol))
-            
-            # Execute tasks and save results
-            successful = []
-            failed = []
-            
-            for ticker, task, ticker_symbol in tasks:
+        adjustment_suffix = "adj" if auto_adjust else "raw"
+        if period:
+            file_stem = f"{period}_{adjustment_suffix}"
+        else:
+            file_stem = f"{start_date}_{end_date}_{adjustment_suffix}"
+        
+        # Each downloaded ticker is processed and written while the remaining
+        # downloads continue; the queue bounds the number of frames in flight
+        queue = asyncio.Queue(maxsize=self.max_concurrent)
+        loop = asyncio.get_running_loop()
+        frames = {}
+        unsaved = []
+        
+        # Halve the in-memory and on-disk size of binary and csv output
+        prepare = functools.partial(
+            _prepare_frame, downcast=downcast and output_format != "json", post_process=post_process
+        )
+        
+        # Tickers are independent, so CPU-bound processing scales across cores.
+        # Closures and lambdas cannot be sent to worker processes and run on threads.
+        process_pool = None
+        if post_process is not None and _is_picklable(post_process):
+            process_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+        
+        async def write_worker():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                
+                ticker_symbol, data = item
                 try:
-                    data = await task
-                    if data is not None and not data.empty:
-                        # Save data based on format
-                        adjustment_suffix = "adj" if auto_adjust else "raw"
-                        if period:
-                            filename = f"{ticker_symbol}_{period}_{adjustment_suffix}.{output_format}"
-                        else:
-                            filename = f"{ticker_symbol}_{start_date}_{end_date}_{adjustment_suffix}.{output_format}"
-                        filepath = Path(output_dir) / filename
-                        
-                        if output_format == "csv":
-                            data.to_csv(filepath, index=False)
-                        elif output_format == "parquet":
-                            data.to_parquet(filepath, index=False)
-                        elif output_format == "json":
-                            data.to_json(filepath, orient='records', date_format='iso')
-                        
-                        successful.append(ticker)
-                    else:
-                        failed.append(ticker)
+                    data, error = await loop.run_in_executor(process_pool, prepare, ticker_symbol, data)
+                    if error:
+                        logger.error(f"Error processing data for {ticker_symbol}: {error}")
+                    
+                    # Parquet output is one dataset, written once all tickers are in
+                    if output_format == "parquet":
+                        frames[ticker_symbol] = data
+                        continue
+                    
+                    filepath = Path(output_dir) / f"{ticker_symbol}_{file_stem}.{output_format}"
+                    error = await asyncio.to_thread(_write_ticker_file, data, filepath, output_format)
                 except Exception as e:
-                    logger.error(f"Error processing {ticker}: {str(e)}")
-                    failed.append(ticker)
-                finally:
-                    pbar.update(1)
+                    error = str(e)
+                if error:
+                    logger.error(f"Error saving {ticker_symbol}: {error}")
+                    unsaved.append(ticker_symbol)
+        
+        writers = [asyncio.create_task(write_worker()) for _ in range(os.cpu_count() or 1)]
+        
+        # Download every ticker concurrently over one connection pool. Failed
+        # requests and empty responses are left pending for the next pass.
+        params = self._chart_params(start_date, end_date, period)
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+        downloaded = set()
+        
+        # Only the loop owned by download_sync outlives this call, so other
+        # callers get a session that is closed when the download finishes
+        shared_session = asyncio.get_running_loop() is self._loop
+        session = None
+        try:
+            if shared_session:
+                if self._session is None or self._session.closed:
+                    self._session = self._new_session()
+                session = self._session
+            else:
+                session = self._new_session()
+            
+            for attempt in range(max(self.retry_attempts, 1)):
+                if attempt > 0:
+                    await asyncio.sleep(self.retry_delay * (2 ** (attempt - 1)))
+                    logger.info(f"Retrying {len(pending)} tickers (attempt {attempt + 1} of {self.retry_attempts})")
+                
+                tasks = [
+                    self.download_ticker(session, semaphore, symbol, params, auto_adjust)
+                    for symbol in pending
+                ]
+                desc = "Downloading tickers" if attempt == 0 else "Retrying tickers"
+                for future in tqdm.as_completed(tasks, total=len(tasks), desc=desc, unit="ticker", mininterval=0.25):
+                    symbol, data = await future
+                    if data is not None:
+                        downloaded.add(symbol)
+                        await queue.put((symbol, data))
+                
+                pending = [symbol for symbol in pending if symbol not in downloaded]
+                if not pending:
+                    break
             
-            pbar.close()
+            # Let the writers drain the queue
+            for _ in writers:
+                await queue.put(None)
+            await asyncio.gather(*writers)
+        finally:
+            for writer in writers:
+                writer.cancel()
+            if process_pool is not None:
+                process_pool.shutdown(cancel_futures=True)
+            if session is not None and not shared_session:
+                await session.close()
+        
+        if pending:
+            logger.error(f"Failed to download {len(pending)} tickers after {self.retry_attempts} attempts")
+        
+        # Keep the event loop free while the dataset is written
+        if output_format == "parquet":
+            unsaved = await asyncio.to_thread(self.save_dataset, frames, output_dir, file_stem)
+        
+        # Collect results
+        successful = []
+        failed = []
+        
+        for ticker, (ticker_symbol, ticker_name) in parsed_tickers.items():
+            if ticker_symbol not in downloaded:
+                logger.warning(f"No data found for ticker: {ticker_symbol} ({ticker_name})")
+                failed.append(ticker)
+            elif ticker_symbol in unsaved:
+                failed.append(ticker)
+            else:
+                successful.append(ticker)
         
         return {
             "total": len(tickers),
@@ -216,19 +433,65 @@ class ParallelDownloader:
             "failed_tickers": failed
         }
     
+    @staticmethod
+    def save_dataset(
+        frames: Dict[str, pd.DataFrame],
+        output_dir: str,
+        file_stem: str
+    ) -> List[str]:
+        """
+        Save downloaded data as one Hive-partitioned parquet dataset
+        
+        Each ticker is written to ``ticker=XYZ/{file_stem}-0.parquet``. Other
+        formats are written per ticker as the downloads arrive.
+        
+        Args:
+            frames: Dictionary mapping ticker symbols to DataFrames
+            output_dir: Directory to save downloaded data
+            file_stem: Period or date range and adjustment part of the file names
+            
+        Returns:
+            List of ticker symbols that could not be saved
+        """
+        if not frames:
+            return []
+        
+        try:
+            table = to_arrow_table(DataProcessor.concat_frames(list(frames.values())))
+            ds.write_dataset(
+                table,
+                output_dir,
+                format='parquet',
+                file_options=ds.ParquetFileFormat().make_write_options(**PARQUET_WRITE_OPTIONS),
+                partitioning=['ticker'],
+                partitioning_flavor='hive',
+                basename_template=f"{file_stem}-{{i}}.parquet",
+                existing_data_behavior='overwrite_or_ignore',
+                max_rows_per_file=1_000_000,
+                max_rows_per_group=1_000_000
+            )
+            return []
+        except Exception as e:
+            logger.error(f"Error saving parquet dataset to {output_dir}: {str(e)}")
+            return list(frames)
+    
     def download_sync(
         self,
         tickers: List[str],
         start_date: str,
         end_date: str,
         output_dir: str = "data/downloads",
-        output_format: str = "csv",
+        output_format: str = "parquet",
         period: Optional[str] = None,
-        auto_adjust: bool = True
+        auto_adjust: bool = True,
+        post_process: Optional[Callable[[str, pd.DataFrame], pd.DataFrame]] = None,
+        downcast: bool = True
     ) -> Dict[str, Union[int, List[str]]]:
         """
         Synchronous wrapper for async download
         
+        Connections are kept open between calls until close() is called.
+        
         Args:
             tickers: List of ticker symbols
             start_date: Start date in YYYY-MM-DD format
@@ -236,11 +499,18 @@ class ParallelDownloader:
             output_dir: Directory to save downloaded data
             output_format: Output format (csv, parquet, json)
             period: Period parameter (e.g., "max", "1y", "5y") - if provided, ignores start/end dates
+            post_process: Optional callable applied to each (ticker, DataFrame) before saving
+            downcast: Whether to store prices as float32 (not applied to json)
             
         Returns:
             Dictionary with download statistics
         """
-        return asyncio.run(
+        # Keep one event loop alive between calls so the shared session
+        # and its open connections stay usable
+        if self._loop is None or self._loop.is_closed():
+            self._loop = asyncio.new_event_loop()
+        
+        return self._loop.run_until_complete(
             self.download_tickers(
                 tickers=tickers,
                 start_date=start_date,
@@ -248,7 +518,9 @@ class ParallelDownloader:
                 output_dir=output_dir,
                 output_format=output_format,
                 period=period,
-                auto_adjust=auto_adjust
+                auto_adjust=auto_adjust,
+                post_process=post_process,
+                downcast=downcast
             )
         )
     
@@ -263,24 +535,202 @@ class ParallelDownloader:
             Dictionary with ticker information
         """
         try:
-            stock = yf.Ticker(ticker)
-            info = stock.info
-            return info
+            return dict(_fetch_info(ticker))
         except Exception as e:
             logger.error(f"Error getting info for {ticker}: {str(e)}")
             return None
+    
+    def get_ticker_info_batch(self, tickers: List[str]) -> Dict[str, Dict]:
+        """
+        Get quote information for many tickers with one request per batch
+        
+        Uses Yahoo's quote endpoint, which returns fewer fields than
+        get_ticker_info but serves up to QUOTE_BATCH_SIZE symbols per request.
+        
+        Args:
+            tickers: List of ticker symbols
+            
+        Returns:
+            Dictionary mapping each found symbol to its quote information
+        """
+        # Imported here so downloads, which do not use yfinance, skip its slow import
+        from yfinance.data import YfData
+        
+        quotes = {}
+        for chunk in chunk_ndarray(list(dict.fromkeys(tickers)), QUOTE_BATCH_SIZE):
+            try:
+                # YfData handles the cookie and crumb the endpoint requires
+                response = YfData().get_raw_json(
+                    QUOTE_URL, params={'symbols': ','.join(chunk)}, timeout=self.timeout
+                )
+                for quote in response['quoteResponse']['result']:
+                    quotes[quote['symbol']] = quote
+            except Exception as e:
+                logger.error(f"Error getting quotes for {len(chunk)} tickers: {str(e)}")
+        
+        return quotes
+
+
+def _parse_ticker(ticker: str) -> Tuple[str, str]:
+    """
+    Split an entry in the ticker,name format
+    
+    Args:
+        ticker: Ticker symbol, optionally followed by a comma and its name
+        
+    Returns:
+        Tuple of the ticker symbol and name, which is empty if not given
+    """
+    symbol, _, name = ticker.partition(',')
+    return symbol.strip(), name.strip()
+
+
+def _is_picklable(obj) -> bool:
+    """Check whether an object can be sent to a worker process"""
+    try:
+        pickle.dumps(obj)
+    except Exception:
+        return False
+    return True
+
+
+def _prepare_frame(
+    ticker_symbol: str,
+    data: pd.DataFrame,
+    downcast: bool,
+    post_process: Optional[Callable[[str, pd.DataFrame], pd.DataFrame]]
+) -> Tuple[pd.DataFrame, Optional[str]]:
+    """
+    Downcast and post-process one ticker's data before it is saved
+    
+    Defined at module level so it can be sent to worker processes.
+    
+    Args:
+        ticker_symbol: Stock ticker symbol
+        data: DataFrame with OHLCV data
+        downcast: Whether to store prices as float32
+        post_process: Optional callable applied to (ticker, DataFrame)
+        
+    Returns:
+        Tuple of the DataFrame to save and an error message. If
+        post-processing fails, the unprocessed data is returned with the error.
+    """
+    if downcast:
+        data = DataProcessor.downcast_data(data)
+    
+    if post_process is None:
+        return data, None
+    
+    processed, error = _apply_post_process(post_process, ticker_symbol, data)
+    if error:
+        return data, error
+    return processed, None
+
+
+def _write_ticker_file(data: pd.DataFrame, filepath: Path, output_format: str) -> Optional[str]:
+    """
+    Write one ticker's data, returning errors instead of raising
+    
+    Args:
+        data: DataFrame with OHLCV data
+        filepath: Output file path
+        output_format: Output format (csv, json)
+        
+    Returns:
+        Error message, or None if the file was written
+    """
+    try:
+        if output_format == "csv":
+            # The pinned date32 type writes plain YYYY-MM-DD dates
+            pa_csv.write_csv(to_arrow_table(data), filepath)
+        elif output_format == "json":
+            write_json(data, filepath)
+    except Exception as e:
+        return str(e)
+    return None
 
 
-def load_tickers_from_file(filepath: str) -> List[str]:
+def _event_values(
+    timestamps: np.ndarray,
+    events: Optional[Dict],
+    value: Callable[[Dict], float]
+) -> np.ndarray:
+    """
+    Align chart events such as dividends or splits with the daily bars
+    
+    Args:
+        timestamps: Bar timestamps in ascending order
+        events: Chart events keyed by timestamp, if any
+        value: Callable extracting the value of an event
+        
+    Returns:
+        Array with each event's value on its bar and zero elsewhere
+    """
+    values = np.zeros(len(timestamps))
+    for event in (events or {}).values():
+        # Events belong to the bar that was open at the event time
+        position = np.searchsorted(timestamps, event['date'], side='right') - 1
+        values[max(position, 0)] += value(event)
+    return values
+
+
+@functools.lru_cache(maxsize=1024)
+def _fetch_info(ticker: str) -> Dict:
+    """Fetch ticker information from Yahoo, cached per ticker"""
+    # Imported here so downloads, which do not use yfinance, skip its slow import
+    import yfinance as yf
+    
+    return yf.Ticker(ticker).info
+
+
+def _apply_post_process(
+    post_process: Callable[[str, pd.DataFrame], pd.DataFrame],
+    ticker_symbol: str,
+    data: pd.DataFrame
+) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+    """
+    Run a post-processing callable, returning errors instead of raising
+    
+    Defined at module level so it can be sent to worker processes.
+    
+    Args:
+        post_process: Callable applied to (ticker, DataFrame)
+        ticker_symbol: Stock ticker symbol
+        data: Downloaded DataFrame
+        
+    Returns:
+        Tuple of (processed DataFrame, None) or (None, error message)
+    """
+    try:
+        return post_process(ticker_symbol, data), None
+    except Exception as e:
+        return None, str(e)
+
+
+def load_tickers_from_file(filepath: str) -> Tuple[str, ...]:
     """
     Load tickers from a text file
     
+    Results are cached by file modification time, so a file is only read
+    again after it changes.
+    
     Args:
         filepath: Path to ticker file
         
     Returns:
-        List of ticker symbols
+        Tuple of ticker symbols
     """
+    try:
+        mtime = os.stat(filepath).st_mtime_ns
+    except OSError as e:
+        logger.error(f"Error loading tickers from {filepath}: {str(e)}")
+        return ()
+    return _read_ticker_file(filepath, mtime)
+
+
+@functools.lru_cache(maxsize=None)
+def _read_ticker_file(filepath: str, mtime: int) -> Tuple[str, ...]:
+    """Read the tickers of a file, cached per path and modification time"""
     try:
         with open(filepath, 'r') as f:
             tickers = []
@@ -293,22 +743,25 @@ def load_tickers_from_file(filepath: str) -> List[str]:
                     else:
                         ticker = line
                     tickers.append(ticker)
-        return tickers
+        return tuple(tickers)
     except Exception as e:
         logger.error(f"Error loading tickers from {filepath}: {str(e)}")
-        return []
+        return ()
 
 
-def get_country_tickers(country: str, data_dir: str = "data/tickers") -> List[str]:
+def get_country_tickers(country: str, data_dir: str = "data/tickers") -> Tuple[str, ...]:
     """
     Get tickers for a specific country
     
+    The ticker files are cached by load_tickers_from_file, so repeated calls
+    only list the directory and check modification times.
+    
     Args:
         country: Country code (us, uk, jp, de, cn)
         data_dir: Directory containing ticker files
         
     Returns:
-        List of ticker symbols
+        Tuple of ticker symbols
     """
     country_dir = Path(data_dir) / country.lower()
     
@@ -319,11 +772,11 @@ def get_country_tickers(country: str, data_dir: str = "data/tickers") -> List[st
             if file_path.name != 'cn.txt':  # Skip the index file
                 tickers = load_tickers_from_file(str(file_path))
                 all_tickers.extend(tickers)
-        return all_tickers
+        return tuple(all_tickers)
     
     # For other countries, look for the main ticker file
     ticker_file = country_dir / f"{country.lower()}.txt"
     if ticker_file.exists():
         return load_tickers_from_file(str(ticker_file))
     
-    return []
\ No newline at end of file
+    return ()
\ No newline at end of file
@@ -0,0 +1,334 @@
+"""
+Compiled kernels for technical indicators, returns and data checks
+
+The kernels work on contiguous float64 arrays sorted by ticker and date,
+and are compiled with numba when it is installed. Without numba, each
+kernel falls back to a vectorized numpy or pandas equivalent with the same
+results, as the loops would be slow run as plain Python.
+
+fastmath is left off on purpose: it lets the compiler assume there are no
+NaNs, which breaks the missing value handling.
+"""
+
+import numpy as np
+import pandas as pd
+
+try:
+    import numba
+    from numba import njit, prange
+except ImportError:  # numba is optional
+    numba = None
+    prange = range
+    
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit"""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+
+# Rows of the array returned by technical_indicators
+INDICATOR_COLUMNS = (
+    'ma_5', 'ma_10', 'ma_20', 'ma_50', 'rsi', 'macd', 'macd_signal',
+    'macd_histogram', 'bb_middle', 'bb_upper', 'bb_lower'
+)
+
+# Moving average windows, in the order of their rows
+MA_WINDOWS = (5, 10, 20, 50)
+
+RSI_WINDOW = 14
+BB_WINDOW = 20
+
+
+@njit(cache=True)
+def _ewm_update(weighted: float, old_wt: float, current: float, alpha: float):
+    """
+    Advance an exponentially weighted mean by one value
+    
+    Matches ``Series.ewm(span=span, adjust=False).mean()``, where missing
+    values decay the old weight like pandas with ignore_na=False.
+    
+    Args:
+        weighted: Current weighted mean
+        old_wt: Current weight of the mean
+        current: New value
+        alpha: Smoothing factor, 2 / (span + 1)
+        
+    Returns:
+        Tuple of the new weighted mean and weight
+    """
+    is_observation = current == current
+    if weighted == weighted:
+        old_wt *= 1.0 - alpha
+        if is_observation:
+            if weighted != current:
+                weighted = (old_wt * weighted + alpha * current) / (old_wt + alpha)
+            old_wt = 1.0
+    elif is_observation:
+        weighted = current
+    return weighted, old_wt
+
+
+def technical_indicators(close: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    Compute all technical indicators per ticker
+    
+    With numba this is one compiled forward scan per ticker: moving averages
+    and the RSI keep running window sums, Bollinger bands a running Welford
+    mean and sum of squared deviations, and the MACD lines their exponential
+    recurrences, with tickers processed in parallel. Without numba the
+    indicators come from pandas' grouped rolling and exponentially weighted
+    windows.
+    
+    Args:
+        close: Close prices sorted by ticker and date
+        starts: First row of each ticker
+        ends: Row after the last row of each ticker
+        
+    Returns:
+        Array with one row per INDICATOR_COLUMNS entry, NaN where an
+        indicator is undefined
+    """
+    if numba is not None:
+        return _technical_indicators(close, starts, ends)
+    
+    rows = _segment_rows(starts, ends)
+    keys = np.repeat(np.arange(len(starts)), ends - starts)
+    grouped = pd.Series(close[rows]).groupby(keys)
+    
+    moving_averages = [grouped.rolling(window).mean().to_numpy() for window in MA_WINDOWS]
+    
+    # RSI from simple moving averages of gains and losses
+    delta = grouped.diff()
+    gain = delta.where(delta > 0, 0.0).groupby(keys).rolling(RSI_WINDOW).mean().to_numpy()
+    loss = (-delta.where(delta < 0, 0.0)).groupby(keys).rolling(RSI_WINDOW).mean().to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100.0 - 100.0 / (1.0 + gain / loss)
+    
+    # MACD from the 12 and 26 period EMAs, with a 9 period signal line
+    macd = grouped.ewm(span=12, adjust=False).mean() - grouped.ewm(span=26, adjust=False).mean()
+    signal = macd.groupby(level=0).ewm(span=9, adjust=False).mean()
+    macd = macd.to_numpy()
+    signal = signal.to_numpy()
+    
+    # Bollinger bands around the 20 day moving average
+    middle = moving_averages[MA_WINDOWS.index(BB_WINDOW)]
+    width = 2.0 * grouped.rolling(BB_WINDOW).std().to_numpy()
+    
+    out = np.full((len(INDICATOR_COLUMNS), len(close)), np.nan)
+    out[:, rows] = np.vstack(
+        moving_averages + [rsi, macd, signal, macd - signal, middle, middle + width, middle - width]
+    )
+    return out
+
+
+@njit(cache=True, parallel=True)
+def _technical_indicators(close: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Per-ticker forward scan behind technical_indicators"""
+    out = np.full((len(INDICATOR_COLUMNS), len(close)), np.nan)
+    
+    for g in prange(len(starts)):
+        start = starts[g]
+        end = ends[g]
+        
+        # Running sums and missing value counts of the moving average windows
+        ma_sums = np.zeros(len(MA_WINDOWS))
+        ma_missing = np.zeros(len(MA_WINDOWS), dtype=np.int64)
+        
+        gain_sum = 0.0
+        loss_sum = 0.0
+        gains = np.zeros(RSI_WINDOW)
+        losses = np.zeros(RSI_WINDOW)
+        
+        bb_count = 0
+        bb_missing = 0
+        bb_mean = 0.0
+        bb_ssqdm = 0.0
+        same_run = 0
+        
+        ema_fast = close[start]
+        ema_fast_wt = 1.0
+        ema_slow = close[start]
+        ema_slow_wt = 1.0
+        signal = 0.0
+        signal_wt = 1.0
+        
+        for i in range(start, end):
+            n = i - start
+            value = close[i]
+            
+            # Simple moving averages
+            for k in range(len(MA_WINDOWS)):
+                window = MA_WINDOWS[k]
+                if value == value:
+                    ma_sums[k] += value
+                else:
+                    ma_missing[k] += 1
+                if n >= window:
+                    leaving = close[i - window]
+                    if leaving == leaving:
+                        ma_sums[k] -= leaving
+                    else:
+                        ma_missing[k] -= 1
+                if n >= window - 1 and ma_missing[k] == 0:
+                    out[k, i] = ma_sums[k] / window
+            
+            # RSI from simple moving averages of gains and losses
+            gain = 0.0
+            loss = 0.0
+            if n > 0:
+                delta = value - close[i - 1]
+                if delta > 0:
+                    gain = delta
+                elif delta < 0:
+                    loss = -delta
+            slot = n % RSI_WINDOW
+            gain_sum += gain - gains[slot]
+            loss_sum += loss - losses[slot]
+            gains[slot] = gain
+            losses[slot] = loss
+            if n >= RSI_WINDOW - 1:
+                if loss_sum != 0:
+                    out[4, i] = 100.0 - 100.0 / (1.0 + gain_sum / loss_sum)
+                elif gain_sum > 0:
+                    out[4, i] = 100.0
+            
+            # MACD from the 12 and 26 period EMAs, with a 9 period signal line
+            if n > 0:
+                ema_fast, ema_fast_wt = _ewm_update(ema_fast, ema_fast_wt, value, 2.0 / 13.0)
+                ema_slow, ema_slow_wt = _ewm_update(ema_slow, ema_slow_wt, value, 2.0 / 27.0)
+            macd = ema_fast - ema_slow
+            if n == 0:
+                signal = macd
+            else:
+                signal, signal_wt = _ewm_update(signal, signal_wt, macd, 2.0 / 10.0)
+            out[5, i] = macd
+            out[6, i] = signal
+            out[7, i] = macd - signal
+            
+            # Bollinger bands from a sliding Welford variance
+            if value == value:
+                same_run = same_run + 1 if n > 0 and value == close[i - 1] else 1
+                bb_count += 1
+                delta = value - bb_mean
+                bb_mean += delta / bb_count
+                bb_ssqdm += delta * (value - bb_mean)
+            else:
+                same_run = 0
+                bb_missing += 1
+            if n >= BB_WINDOW:
+                leaving = close[i - BB_WINDOW]
+                if leaving == leaving:
+                    bb_count -= 1
+                    if bb_count > 0:
+                        delta = leaving - bb_mean
+                        bb_mean -= delta / bb_count
+                        bb_ssqdm -= delta * (leaving - bb_mean)
+                    else:
+                        bb_mean = 0.0
+                        bb_ssqdm = 0.0
+                else:
+                    bb_missing -= 1
+            if n >= BB_WINDOW - 1 and bb_missing == 0:
+                middle = out[2, i]
+                width = 0.0
+                # Like pandas, a window of identical prices has exactly zero
+                # deviation instead of the rounding residue of the updates
+                if same_run < BB_WINDOW:
+                    width = 2.0 * np.sqrt(max(bb_ssqdm, 0.0) / (BB_WINDOW - 1))
+                out[8, i] = middle
+                out[9, i] = middle + width
+                out[10, i] = middle - width
+    
+    return out
+
+
+def _segment_rows(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Positions of the rows in the given ticker ranges, in order"""
+    lengths = ends - starts
+    return np.arange(lengths.sum()) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+
+
+def segmented_cumsum(values: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    Cumulative sum restarting at each ticker, matching ``groupby().cumsum()``
+    
+    Missing values are skipped and stay missing in the output. Without numba
+    one cumulative sum runs over all rows and each ticker's running total
+    before its first row is subtracted.
+    
+    Args:
+        values: Values sorted by ticker and date
+        starts: First row of each ticker
+        ends: Row after the last row of each ticker
+        
+    Returns:
+        Array with the running sums, NaN outside the given rows
+    """
+    if numba is not None:
+        return _segmented_cumsum(values, starts, ends)
+    
+    missing = np.isnan(values)
+    totals = np.cumsum(np.where(missing, 0.0, values))
+    
+    # Positions of the rows in the given ranges, and the total before each range
+    rows = _segment_rows(starts, ends)
+    offsets = np.repeat(totals[starts] - np.where(missing[starts], 0.0, values[starts]), ends - starts)
+    
+    out = np.full(len(values), np.nan)
+    out[rows] = totals[rows] - offsets
+    out[missing] = np.nan
+    return out
+
+
+@njit(cache=True)
+def _segmented_cumsum(values: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Per-ticker loop behind segmented_cumsum"""
+    out = np.full(len(values), np.nan)
+    for g in range(len(starts)):
+        total = 0.0
+        for i in range(starts[g], ends[g]):
+            value = values[i]
+            if value == value:
+                total += value
+                out[i] = total
+    return out
+
+
+def ohlc_violations(open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray):
+    """
+    Count rows breaking the OHLC price relationships
+    
+    With numba each row is read once and both checks run on the same values
+    in one parallel pass. Without it the checks are two numpy scans.
+    
+    Args:
+        open_: Open prices without missing values
+        high: High prices without missing values
+        low: Low prices without missing values
+        close: Close prices without missing values
+        
+    Returns:
+        Tuple of the number of rows whose high is below the open, low or
+        close, and whose low is above the open, high or close
+    """
+    if numba is None:
+        invalid_high = high < np.maximum(np.maximum(open_, low), close)
+        invalid_low = low > np.minimum(np.minimum(open_, high), close)
+        return int(invalid_high.sum()), int(invalid_low.sum())
+    return _ohlc_violations(open_, high, low, close)
+
+
+@njit(cache=True, parallel=True)
+def _ohlc_violations(open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray):
+    """Fused parallel kernel behind ohlc_violations"""
+    invalid_high = 0
+    invalid_low = 0
+    for i in prange(len(close)):
+        h = high[i]
+        l = low[i]
+        if h < open_[i] or h < l or h < close[i]:
+            invalid_high += 1
+        if l > open_[i] or l > h or l > close[i]:
+            invalid_low += 1
+    return invalid_high, invalid_low
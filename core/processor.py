@@ -3,11 +3,15 @@ Data processing utilities for Yahoo Finance data
 """
 
 import pandas as pd
+from pandas.api.types import union_categoricals
 import numpy as np
-from typing import Dict, List, Optional, Union
+from typing import Dict, List, Optional, Tuple, Union
 from pathlib import Path
 import logging
 
+from core.indicators import INDICATOR_COLUMNS, ohlc_violations, segmented_cumsum, technical_indicators
+from core.utils import DOWNCAST_COLUMNS
+
 logger = logging.getLogger(__name__)
 
 
@@ -38,26 +42,37 @@ class DataProcessor:
         # Remove rows with missing OHLCV data
         df = df.dropna(subset=['open', 'high', 'low', 'close', 'volume'])
         
-        # Remove duplicate dates
-        df = df.drop_duplicates(subset=['date', 'ticker'])
+        # Encode tickers as categories once, so later sorts and groupings
+        # work on integer codes instead of hashing strings
+        if not isinstance(df['ticker'].dtype, pd.CategoricalDtype):
+            df = df.assign(ticker=df['ticker'].astype('category'))
         
-        # Sort by date and ticker
-        df = df.sort_values(['ticker', 'date'])
+        # Sort by ticker and date; the stable sort keeps the first of any duplicates first
+        df = df.sort_values(['ticker', 'date'], kind='stable')
+        
+        # Remove duplicate dates, which are now adjacent rows
+        tickers = DataProcessor._ticker_codes(df['ticker'])
+        dates = df['date'].to_numpy()
+        keep = np.ones(len(df), dtype=bool)
+        keep[1:] = (tickers[1:] != tickers[:-1]) | (dates[1:] != dates[:-1])
+        if not keep.all():
+            df = df[keep]
         
         # Validate OHLC relationships
         # High should be >= Open, Low, Close
         # Low should be <= Open, High, Close
-        invalid_high = df['high'] < df[['open', 'low', 'close']].max(axis=1)
-        invalid_low = df['low'] > df[['open', 'high', 'close']].min(axis=1)
+        invalid_high, invalid_low = ohlc_violations(
+            *(df[col].to_numpy(dtype=np.float64) for col in ('open', 'high', 'low', 'close'))
+        )
         
-        if invalid_high.any() or invalid_low.any():
-            logger.warning(f"Found {invalid_high.sum()} invalid high prices and {invalid_low.sum()} invalid low prices")
+        if invalid_high or invalid_low:
+            logger.warning(f"Found {invalid_high} invalid high prices and {invalid_low} invalid low prices")
         
         # Volume should be non-negative
-        negative_volume = df['volume'] < 0
+        negative_volume = df['volume'].to_numpy() < 0
         if negative_volume.any():
             logger.warning(f"Found {negative_volume.sum()} rows with negative volume")
-            df.loc[negative_volume, 'volume'] = 0
+            df = df.assign(volume=df['volume'].clip(lower=0))
         
         return df
     
@@ -75,43 +90,74 @@ class DataProcessor:
         if df.empty:
             return df
         
-        df = df.copy()
-        
-        # Sort by ticker and date
+        # Sort by ticker and date, so each ticker is one contiguous slice
         df = df.sort_values(['ticker', 'date'])
+        close = np.ascontiguousarray(df['close'].to_numpy(dtype=np.float64))
         
-        # Group by ticker to calculate indicators per stock
-        for ticker, group in df.groupby('ticker'):
-            # Moving averages
-            group['ma_5'] = group['close'].rolling(window=5).mean()
-            group['ma_10'] = group['close'].rolling(window=10).mean()
-            group['ma_20'] = group['close'].rolling(window=20).mean()
-            group['ma_50'] = group['close'].rolling(window=50).mean()
-            
-            # RSI (Relative Strength Index)
-            delta = group['close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-            rs = gain / loss
-            group['rsi'] = 100 - (100 / (1 + rs))
-            
-            # MACD
-            exp1 = group['close'].ewm(span=12, adjust=False).mean()
-            exp2 = group['close'].ewm(span=26, adjust=False).mean()
-            group['macd'] = exp1 - exp2
-            group['macd_signal'] = group['macd'].ewm(span=9, adjust=False).mean()
-            group['macd_histogram'] = group['macd'] - group['macd_signal']
+        starts, ends = DataProcessor._ticker_slices(df['ticker'])
+        
+        # Moving averages, RSI, MACD and Bollinger bands in one fused pass
+        indicators = technical_indicators(close, starts, ends)
+        out = dict(zip(INDICATOR_COLUMNS, indicators))
+        
+        return df.assign(**out)
+    
+    @staticmethod
+    def _ticker_slices(tickers: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the row ranges of each ticker in a non-empty frame sorted by ticker
+        
+        Args:
+            tickers: Sorted ticker column
             
-            # Bollinger Bands
-            group['bb_middle'] = group['close'].rolling(window=20).mean()
-            bb_std = group['close'].rolling(window=20).std()
-            group['bb_upper'] = group['bb_middle'] + (bb_std * 2)
-            group['bb_lower'] = group['bb_middle'] - (bb_std * 2)
+        Returns:
+            Tuple of start and end row position arrays, skipping rows without a ticker
+        """
+        codes = DataProcessor._ticker_codes(tickers)
+        boundaries = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+        starts = np.concatenate(([0], boundaries)).astype(np.int64)
+        ends = np.concatenate((boundaries, [len(codes)])).astype(np.int64)
+        has_ticker = codes[starts] >= 0
+        return starts[has_ticker], ends[has_ticker]
+    
+    @staticmethod
+    def _ticker_codes(tickers: pd.Series) -> np.ndarray:
+        """
+        Get integer codes of a ticker column, reusing them for categorical columns
+        
+        Args:
+            tickers: Ticker column
             
-            # Update the main dataframe
-            df.loc[group.index, group.columns] = group
+        Returns:
+            Array of codes, -1 where the ticker is missing
+        """
+        if isinstance(tickers.dtype, pd.CategoricalDtype):
+            return tickers.cat.codes.to_numpy()
+        return pd.factorize(tickers)[0]
+    
+    @staticmethod
+    def concat_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+        """
+        Concatenate frames while keeping the ticker column categorical
         
-        return df
+        pd.concat falls back to strings when the categories of the frames
+        differ, so the tickers are first recoded to the union of all categories.
+        
+        Args:
+            frames: DataFrames with a ticker column
+            
+        Returns:
+            Concatenated DataFrame with a new index
+        """
+        if not all('ticker' in frame.columns for frame in frames):
+            return pd.concat(frames, ignore_index=True)
+        
+        tickers = [frame['ticker'].astype('category') for frame in frames]
+        categories = union_categoricals(tickers, sort_categories=True).categories
+        return pd.concat([
+            frame.assign(ticker=ticker.cat.set_categories(categories))
+            for frame, ticker in zip(frames, tickers)
+        ], ignore_index=True)
     
     @staticmethod
     def resample_data(
@@ -133,28 +179,48 @@ class DataProcessor:
         
         df = df.copy()
         df['date'] = pd.to_datetime(df['date'])
-        df.set_index('date', inplace=True)
-        
-        # Group by ticker and resample
-        resampled_groups = []
-        for ticker, group in df.groupby('ticker'):
-            resampled = group.resample(frequency).agg({
-                'open': 'first',
-                'high': 'max',
-                'low': 'min',
-                'close': 'last',
-                'volume': 'sum'
-            }).dropna()
-            
-            resampled['ticker'] = ticker
-            resampled_groups.append(resampled)
         
-        if resampled_groups:
-            result = pd.concat(resampled_groups)
-            result.reset_index(inplace=True)
-            return result
-        else:
+        # Group by ticker and resample in one call, without a Python loop over tickers
+        resampled = df.set_index('date').groupby('ticker', observed=True).resample(frequency).agg({
+            'open': 'first',
+            'high': 'max',
+            'low': 'min',
+            'close': 'last',
+            'volume': 'sum'
+        }).dropna()
+        
+        if resampled.empty:
             return pd.DataFrame()
+        
+        result = resampled.reset_index()
+        return result[['date', 'open', 'high', 'low', 'close', 'volume', 'ticker']]
+    
+    @staticmethod
+    def downcast_data(
+        df: pd.DataFrame,
+        columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """
+        Store price columns as float32
+        
+        Every given column is cast whatever its values, so all files written
+        with downcasting share one schema. float32 keeps about 7 significant
+        digits, which drops the last of the 4 decimals prices are rounded to
+        once a price reaches 1000. Volume stays int64.
+        
+        Args:
+            df: DataFrame with OHLCV data
+            columns: Columns to cast, the raw price columns (DOWNCAST_COLUMNS)
+                by default
+            
+        Returns:
+            DataFrame with downcast columns
+        """
+        if df.empty:
+            return df
+        
+        columns = [col for col in (columns or DOWNCAST_COLUMNS) if col in df.columns]
+        return df.astype({col: np.float32 for col in columns})
     
     @staticmethod
     def merge_dataframes(
@@ -194,19 +260,28 @@ class DataProcessor:
         if df.empty:
             return df
         
-        df = df.copy()
         df = df.sort_values(['ticker', 'date'])
+        starts, ends = DataProcessor._ticker_slices(df['ticker'])
+        
+        # Calculate log returns with one log and one difference
+        log_price = np.log(df['close'].to_numpy(dtype=np.float64))
+        log_return = np.full(len(df), np.nan)
+        log_return[1:] = log_price[1:] - log_price[:-1]
         
-        # Calculate daily returns
-        df['daily_return'] = df.groupby('ticker')['close'].pct_change()
+        # The first row of each ticker has no previous close
+        log_return[starts] = np.nan
         
-        # Calculate log returns
-        df['log_return'] = np.log(df['close'] / df['close'].shift(1))
+        # Calculate daily returns, since close / previous close - 1 = exp(log return) - 1
+        daily_return = np.expm1(log_return)
         
         # Calculate cumulative returns
-        df['cumulative_return'] = df.groupby('ticker')['daily_return'].cumsum()
+        cumulative_return = segmented_cumsum(daily_return, starts, ends)
         
-        return df
+        return df.assign(
+            daily_return=daily_return,
+            log_return=log_return,
+            cumulative_return=cumulative_return
+        )
     
     @staticmethod
     def filter_by_date_range(
@@ -228,11 +303,55 @@ class DataProcessor:
         if df.empty:
             return df
         
-        df = df.copy()
-        df['date'] = pd.to_datetime(df['date'])
+        dates = DataProcessor._date_values(df)
+        mask = (dates >= np.datetime64(start_date)) & (dates <= np.datetime64(end_date))
+        return df.iloc[np.flatnonzero(mask)]
+    
+    @staticmethod
+    def filter_sorted_by_date_range(
+        df: pd.DataFrame,
+        start_date: str,
+        end_date: str
+    ) -> pd.DataFrame:
+        """
+        Filter a DataFrame sorted by date by date range
+        
+        Finds the bounds with a binary search instead of comparing every row,
+        so it suits single-ticker frames or frames sorted by date alone.
         
-        mask = (df['date'] >= start_date) & (df['date'] <= end_date)
-        return df[mask]
+        Args:
+            df: DataFrame with date column, sorted by date
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+            
+        Returns:
+            Filtered DataFrame
+        """
+        if df.empty:
+            return df
+        
+        dates = DataProcessor._date_values(df)
+        start = np.searchsorted(dates, np.datetime64(start_date), side='left')
+        end = np.searchsorted(dates, np.datetime64(end_date), side='right')
+        return df.iloc[start:end]
+    
+    @staticmethod
+    def _date_values(df: pd.DataFrame) -> np.ndarray:
+        """
+        Get the date column as a datetime64 array, parsing it only if needed
+        
+        Args:
+            df: DataFrame with date column
+            
+        Returns:
+            Array of naive datetime64 values, in local time for timezone-aware dates
+        """
+        dates = df['date']
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.to_datetime(dates)
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_localize(None)
+        return dates.to_numpy()
     
     @staticmethod
     def get_data_summary(df: pd.DataFrame) -> Dict:
@@ -248,24 +367,76 @@ class DataProcessor:
         if df.empty:
             return {}
         
+        # Count ticker changes between neighbouring rows instead of hashing
+        # every value when the frame is sorted by ticker
+        tickers = df['ticker']
+        if tickers.is_monotonic_increasing:
+            values = DataProcessor._ticker_codes(tickers)
+            unique_tickers = int((values[1:] != values[:-1]).sum()) + 1
+        else:
+            unique_tickers = tickers.nunique()
+        
+        close = DataProcessor._valid_values(df['close'])
+        volume = DataProcessor._valid_values(df['volume'])
+        
         summary = {
             'total_records': len(df),
-            'unique_tickers': df['ticker'].nunique(),
+            'unique_tickers': unique_tickers,
             'date_range': {
                 'start': df['date'].min(),
                 'end': df['date'].max()
             },
             'price_stats': {
-                'min_close': df['close'].min(),
-                'max_close': df['close'].max(),
-                'mean_close': df['close'].mean(),
-                'median_close': df['close'].median()
+                'min_close': close.min() if len(close) else np.nan,
+                'max_close': close.max() if len(close) else np.nan,
+                'mean_close': close.mean() if len(close) else np.nan,
+                'median_close': DataProcessor._median(close)
             },
             'volume_stats': {
-                'total_volume': df['volume'].sum(),
-                'mean_volume': df['volume'].mean(),
-                'median_volume': df['volume'].median()
+                'total_volume': volume.sum(),
+                'mean_volume': volume.mean() if len(volume) else np.nan,
+                'median_volume': DataProcessor._median(volume)
             }
         }
         
-        return summary
\ No newline at end of file
+        return summary
+    
+    @staticmethod
+    def _valid_values(column: pd.Series) -> np.ndarray:
+        """
+        Get the non-missing values of a numeric column as a numpy array
+        
+        Args:
+            column: Numeric column
+            
+        Returns:
+            Array without NaN values
+        """
+        values = column.to_numpy()
+        if values.dtype.kind == 'f':
+            values = values[~np.isnan(values)]
+        return values
+    
+    @staticmethod
+    def _median(values: np.ndarray) -> float:
+        """
+        Median using a partial sort instead of a full one
+        
+        Args:
+            values: Array without NaN values
+            
+        Returns:
+            Median, or NaN for an empty array
+        """
+        n = len(values)
+        if n == 0:
+            return np.nan
+        
+        middle = n // 2
+        if n % 2:
+            return float(np.partition(values, middle)[middle])
+        
+        # Even counts average the two middle values, in float so narrow
+        # integer volumes cannot overflow
+        lower, upper = np.partition(values, [middle - 1, middle])[middle - 1:middle + 1]
+        return (float(lower) + float(upper)) / 2
\ No newline at end of file
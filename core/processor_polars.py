@@ -0,0 +1,148 @@
+"""
+Polars implementations of the DataProcessor operations
+"""
+
+import logging
+
+import polars as pl
+
+logger = logging.getLogger(__name__)
+
+# Price and volume columns a row needs to be kept
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+# Pandas resampling frequencies mapped to polars window sizes
+RESAMPLE_EVERY = {
+    'D': '1d',
+    'W': '1w',
+    'M': '1mo'
+}
+
+
+def validate_data_pl(df: pl.DataFrame) -> pl.DataFrame:
+    """
+    Validate and clean downloaded data, like DataProcessor.validate_data
+    
+    Args:
+        df: Raw DataFrame from Yahoo Finance
+        
+    Returns:
+        Cleaned DataFrame
+    """
+    if df.is_empty():
+        return df
+    
+    # Check required columns
+    required_columns = ['date'] + OHLCV_COLUMNS
+    missing_columns = [col for col in required_columns if col not in df.columns]
+    
+    if missing_columns:
+        logger.warning(f"Missing columns: {missing_columns}")
+    
+    # Remove rows with missing OHLCV data, duplicate dates, and sort by ticker and date
+    df = (
+        df.lazy()
+        .with_columns(pl.col(pl.Float32, pl.Float64).fill_nan(None))
+        .drop_nulls(subset=OHLCV_COLUMNS)
+        .unique(subset=['date', 'ticker'], keep='first', maintain_order=True)
+        .sort(['ticker', 'date'])
+        .collect()
+    )
+    
+    # Validate OHLC relationships in a single pass
+    counts = df.select(
+        (pl.col('high') < pl.max_horizontal('open', 'low', 'close')).sum().alias('invalid_high'),
+        (pl.col('low') > pl.min_horizontal('open', 'high', 'close')).sum().alias('invalid_low'),
+        (pl.col('volume') < 0).sum().alias('negative_volume')
+    ).row(0, named=True)
+    
+    if counts['invalid_high'] or counts['invalid_low']:
+        logger.warning(f"Found {counts['invalid_high']} invalid high prices and {counts['invalid_low']} invalid low prices")
+    
+    # Volume should be non-negative
+    if counts['negative_volume']:
+        logger.warning(f"Found {counts['negative_volume']} rows with negative volume")
+        df = df.with_columns(pl.col('volume').clip(lower_bound=0))
+    
+    return df
+
+
+def calculate_returns_pl(df: pl.DataFrame) -> pl.DataFrame:
+    """
+    Calculate returns for each ticker, like DataProcessor.calculate_returns
+    
+    Args:
+        df: DataFrame with OHLCV data
+        
+    Returns:
+        DataFrame with returns added
+    """
+    if df.is_empty():
+        return df
+    
+    # Work in float64 like pandas, also for prices downcast to float32
+    close = pl.col('close').cast(pl.Float64)
+    
+    return (
+        df.lazy()
+        .sort(['ticker', 'date'])
+        .with_columns(
+            close.pct_change().over('ticker').alias('daily_return'),
+            close.log().diff().over('ticker').alias('log_return')
+        )
+        .with_columns(
+            pl.col('daily_return').cum_sum().over('ticker').alias('cumulative_return')
+        )
+        .collect()
+    )
+
+
+def resample_data_pl(df: pl.DataFrame, frequency: str = 'D') -> pl.DataFrame:
+    """
+    Resample data to different frequency, like DataProcessor.resample_data
+    
+    Periods are labelled with their last day, matching pandas' weekly and
+    month-end bins.
+    
+    Args:
+        df: DataFrame with OHLCV data
+        frequency: Resampling frequency (D, W, M)
+        
+    Returns:
+        Resampled DataFrame
+    """
+    if df.is_empty():
+        return df
+    
+    every = RESAMPLE_EVERY.get(frequency, frequency)
+    
+    date = pl.col('date')
+    if df.schema['date'] == pl.String:
+        date = date.str.to_datetime()
+    
+    resampled = (
+        df.lazy()
+        .with_columns(date.cast(pl.Datetime))
+        .sort(['ticker', 'date'])
+        .group_by_dynamic('date', every=every, group_by='ticker')
+        .agg(
+            pl.col('open').first(),
+            pl.col('high').max(),
+            pl.col('low').min(),
+            pl.col('close').last(),
+            pl.col('volume').sum()
+        )
+        .with_columns(pl.col(pl.Float32, pl.Float64).fill_nan(None))
+        .drop_nulls(subset=OHLCV_COLUMNS)
+    )
+    
+    if every == '1w':
+        resampled = resampled.with_columns(pl.col('date').dt.offset_by('6d'))
+    elif every == '1mo':
+        resampled = resampled.with_columns(pl.col('date').dt.month_end())
+    
+    return (
+        resampled.sort(['ticker', 'date'])
+        .select(['date'] + OHLCV_COLUMNS + ['ticker'])
+        .collect()
+    )
@@ -0,0 +1,66 @@
+"""
+Summary statistics computed by DuckDB directly on data files
+"""
+
+from typing import Dict
+
+import duckdb
+
+SUMMARY_QUERY = """
+SELECT
+    COUNT(*),
+    COUNT(DISTINCT ticker),
+    MIN(date),
+    MAX(date),
+    MIN(close),
+    MAX(close),
+    AVG(close),
+    MEDIAN(close),
+    SUM(volume),
+    AVG(volume),
+    MEDIAN(volume)
+FROM {reader}(?)
+"""
+
+
+def summary_via_duckdb(path: str) -> Dict:
+    """
+    Get summary statistics for a csv or parquet file without loading it
+    
+    DuckDB only reads the referenced columns and aggregates them in a
+    single vectorized scan.
+    
+    Args:
+        path: Path to a csv or parquet file
+        
+    Returns:
+        Dictionary with summary statistics, in the same layout as
+        DataProcessor.get_data_summary
+    """
+    reader = 'read_parquet' if path.endswith('.parquet') else 'read_csv_auto'
+    
+    with duckdb.connect() as con:
+        row = con.execute(SUMMARY_QUERY.format(reader=reader), [path]).fetchone()
+    
+    if not row[0]:
+        return {}
+    
+    return {
+        'total_records': row[0],
+        'unique_tickers': row[1],
+        'date_range': {
+            'start': row[2],
+            'end': row[3]
+        },
+        'price_stats': {
+            'min_close': row[4],
+            'max_close': row[5],
+            'mean_close': row[6],
+            'median_close': row[7]
+        },
+        'volume_stats': {
+            'total_volume': row[8],
+            'mean_volume': row[9],
+            'median_volume': row[10]
+        }
+    }
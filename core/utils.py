@@ -9,10 +9,52 @@ from typing import List, Dict, Optional, Union
 import json
 import csv
 import logging
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to pandas
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+# Price columns DataProcessor.downcast_data stores as float32
+DOWNCAST_COLUMNS = ('open', 'high', 'low', 'close', 'adj_close')
+
+# Storage types for the standard OHLCV columns, so every file of a dataset shares
+# one schema whatever its values; other columns keep their inferred types.
+# Daily bars store dates as 4 byte day numbers; to_arrow_table switches to
+# DATETIME_TYPE for dates with a time of day, and to FLOAT32_TYPE for the
+# prices of downcast data
+OHLCV_SCHEMA = pa.schema([
+    ('date', pa.date32()),
+    ('open', pa.float64()),
+    ('high', pa.float64()),
+    ('low', pa.float64()),
+    ('close', pa.float64()),
+    ('adj_close', pa.float64()),
+    ('volume', pa.int64()),
+    ('ticker', pa.dictionary(pa.int32(), pa.string())),
+])
+DATETIME_TYPE = pa.timestamp('ns')
+FLOAT32_TYPE = pa.float32()
+
+# Parquet writer settings shared by single files and datasets
+PARQUET_WRITE_OPTIONS = {
+    'compression': 'zstd',
+    'use_dictionary': ['ticker'],
+    'data_page_size': 1 << 20,
+    'data_page_version': '2.0',
+}
+
+# Let pyarrow read and write files with one I/O thread per core
+pa.set_io_thread_count(os.cpu_count() or 1)
+
 
 def setup_logging(log_level: str = "INFO", log_file: Optional[str] = None):
     """
@@ -35,6 +77,27 @@ def setup_logging(log_level: str = "INFO", log_file: Optional[str] = None):
     )
 
 
+def _parse_date(date_str: str) -> Optional[date]:
+    """
+    Parse a date string in the YYYY-MM-DD format
+    
+    The shape check keeps the other ISO 8601 forms date.fromisoformat accepts
+    (such as YYYYMMDD) out, and fromisoformat then checks the date exists.
+    
+    Args:
+        date_str: Date string to parse
+        
+    Returns:
+        Parsed date, or None if the string is not a valid date
+    """
+    if len(date_str) != 10 or date_str[4] != '-' or date_str[7] != '-':
+        return None
+    try:
+        return date.fromisoformat(date_str)
+    except ValueError:
+        return None
+
+
 def validate_date_format(date_str: str) -> bool:
     """
     Validate date string format (YYYY-MM-DD)
@@ -45,11 +108,7 @@ def validate_date_format(date_str: str) -> bool:
     Returns:
         True if valid format, False otherwise
     """
-    try:
-        datetime.strptime(date_str, "%Y-%m-%d")
-        return True
-    except ValueError:
-        return False
+    return _parse_date(date_str) is not None
 
 
 def validate_date_range(start_date: str, end_date: str) -> bool:
@@ -63,12 +122,9 @@ def validate_date_range(start_date: str, end_date: str) -> bool:
     Returns:
         True if valid range, False otherwise
     """
-    try:
-        start = datetime.strptime(start_date, "%Y-%m-%d")
-        end = datetime.strptime(end_date, "%Y-%m-%d")
-        return start <= end
-    except ValueError:
-        return False
+    start = _parse_date(start_date)
+    end = _parse_date(end_date)
+    return start is not None and end is not None and start <= end
 
 
 def get_default_date_range(days_back: int = 365) -> tuple:
@@ -224,6 +280,25 @@ def chunk_list(lst: List, chunk_size: int) -> List[List]:
     return [lst[i:i + chunk_size] for i in range(0, len(lst), chunk_size)]
 
 
+def chunk_ndarray(lst: List, chunk_size: int) -> List[np.ndarray]:
+    """
+    Split list into chunks that are views of one object array
+    
+    Chunks are balanced, so each holds at most chunk_size items but sizes
+    may differ from chunk_list.
+    
+    Args:
+        lst: List to chunk
+        chunk_size: Maximum size of each chunk
+        
+    Returns:
+        List of array chunks
+    """
+    if not len(lst):
+        return []
+    return np.array_split(np.asarray(lst, dtype=object), -(-len(lst) // chunk_size))
+
+
 def merge_csv_files(
     input_files: List[str],
     output_file: str,
@@ -241,29 +316,37 @@ def merge_csv_files(
         True if successful, False otherwise
     """
     try:
-        all_data = []
+        tables = []
+        read_options = pa_csv.ReadOptions(use_threads=True)
         
         for file in input_files:
             try:
-                df = pd.read_csv(file)
-                all_data.append(df)
+                tables.append(pa_csv.read_csv(file, read_options=read_options))
             except Exception as e:
                 logger.error(f"Error reading {file}: {str(e)}")
                 continue
         
-        if not all_data:
+        if not tables:
             logger.error("No valid data to merge")
             return False
         
-        # Concatenate all data
-        merged_df = pd.concat(all_data, ignore_index=True)
+        # Concatenate without copying, filling columns missing from some files
+        merged = pa.concat_tables(tables, promote_options='permissive')
         
-        # Remove duplicates if requested
+        # Remove duplicates if requested, keeping the first occurrence of each
+        # row in its original position like drop_duplicates
         if remove_duplicates:
-            merged_df = merged_df.drop_duplicates()
+            columns = merged.column_names
+            merged = (
+                merged.append_column('__row', pa.array(np.arange(merged.num_rows)))
+                .group_by(columns)
+                .aggregate([('__row', 'min')])
+                .sort_by('__row_min')
+                .select(columns)
+            )
         
         # Save merged data
-        merged_df.to_csv(output_file, index=False)
+        pa_csv.write_csv(merged, output_file)
         
         logger.info(f"Merged {len(input_files)} files into {output_file}")
         return True
@@ -273,6 +356,100 @@ def merge_csv_files(
         return False
 
 
+def to_arrow_table(df) -> pa.Table:
+    """
+    Convert a DataFrame to an Arrow table with the pinned OHLCV column types
+    
+    Args:
+        df: DataFrame with OHLCV data
+        
+    Returns:
+        Arrow table without the DataFrame index
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    schema = pa.schema([
+        OHLCV_SCHEMA.field(field.name) if field.name in OHLCV_SCHEMA.names else field
+        for field in table.schema
+    ])
+    
+    # Casting to date32 would silently drop a time of day
+    if 'date' in df.columns:
+        dates = df['date']
+        if not (pd.api.types.is_datetime64_dtype(dates) and _is_whole_days(dates)):
+            index = schema.get_field_index('date')
+            schema = schema.set(index, pa.field('date', DATETIME_TYPE))
+    
+    # Downcast data stores all of its prices as float32, anything else as float64
+    prices = [col for col in DOWNCAST_COLUMNS if col in table.column_names]
+    if prices and all(table.schema.field(col).type == FLOAT32_TYPE for col in prices):
+        for col in prices:
+            schema = schema.set(schema.get_field_index(col), pa.field(col, FLOAT32_TYPE))
+    
+    return table.cast(schema)
+
+
+def write_parquet(df, filepath: str):
+    """
+    Write a DataFrame to a zstd-compressed parquet file
+    
+    Args:
+        df: DataFrame with OHLCV data
+        filepath: Output file path
+    """
+    pq.write_table(to_arrow_table(df), filepath, **PARQUET_WRITE_OPTIONS)
+
+
+def write_json(df, filepath: str):
+    """
+    Write a DataFrame to a JSON file as a list of records
+    
+    Uses orjson when it is installed and pandas otherwise.
+    
+    Args:
+        df: DataFrame with OHLCV data
+        filepath: Output file path
+    """
+    # Format datetimes once per column instead of per record
+    dates = df.select_dtypes(include=['datetime', 'datetimetz']).columns
+    df = df.assign(**{column: _format_datetimes(df[column]) for column in dates})
+    
+    if orjson is None:
+        df.to_json(filepath, orient='records')
+        return
+    
+    Path(filepath).write_bytes(orjson.dumps(
+        df.to_dict(orient='records'),
+        option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC
+    ))
+
+
+def _format_datetimes(column):
+    """
+    Format a datetime column as ISO strings, leaving out the time of whole days
+    
+    Args:
+        column: Datetime Series
+        
+    Returns:
+        Series of YYYY-MM-DD strings, or YYYY-MM-DDTHH:MM:SS if any value has a time
+    """
+    date_format = '%Y-%m-%d' if _is_whole_days(column) else '%Y-%m-%dT%H:%M:%S'
+    return column.dt.strftime(date_format)
+
+
+def _is_whole_days(column) -> bool:
+    """
+    Check whether every value of a datetime column is at midnight
+    
+    Args:
+        column: Datetime Series
+        
+    Returns:
+        True if no value has a time of day, ignoring missing values
+    """
+    return not ((column != column.dt.normalize()) & column.notna()).any()
+
+
 def get_available_countries(data_dir: str = "data/tickers") -> List[str]:
     """
     Get list of available countries with ticker files
@@ -0,0 +1,153 @@
+"""
+Tests for the kernels in core.indicators against their pandas equivalents
+
+Every test runs with the compiled numba kernels and with the numpy and
+pandas fallbacks used when numba is not installed.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import core.indicators as indicators
+from core.indicators import INDICATOR_COLUMNS
+
+
+@pytest.fixture(params=['numba', 'fallback'])
+def kernels(request, monkeypatch):
+    """The indicators module, with numba enabled or disabled"""
+    if request.param == 'numba':
+        if indicators.numba is None:
+            pytest.skip("numba is not installed")
+    else:
+        monkeypatch.setattr(indicators, 'numba', None)
+    return indicators
+
+
+def _make_prices(seed: int = 0) -> pd.DataFrame:
+    """
+    Build closing prices for tickers sorted by ticker and date
+    
+    The tickers cover a single row, windows shorter than every indicator,
+    windows shorter than the 50 day average, flat price runs and missing
+    closes.
+    """
+    rng = np.random.default_rng(seed)
+    frames = []
+    for ticker, length in [('A', 1), ('B', 12), ('C', 35), ('D', 120), ('E', 300)]:
+        close = 100 + rng.standard_normal(length).cumsum()
+        if ticker == 'D':
+            close[10:40] = close[9]
+            close[[5, 60, 61]] = np.nan
+        if ticker == 'E':
+            close[100:125] = 50.0
+            close[200] = np.nan
+        frames.append(pd.DataFrame({'ticker': ticker, 'close': close}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _ticker_slices(frame: pd.DataFrame):
+    """First row and row after the last row of each ticker"""
+    sizes = frame.groupby('ticker', sort=False).size().to_numpy()
+    ends = np.cumsum(sizes)
+    return ends - sizes, ends
+
+
+def _reference_indicators(frame: pd.DataFrame) -> pd.DataFrame:
+    """Indicators computed one ticker at a time with pandas windows"""
+    results = []
+    for _, group in frame.groupby('ticker', sort=False):
+        close = group['close']
+        result = pd.DataFrame(index=group.index)
+        for window in indicators.MA_WINDOWS:
+            result[f'ma_{window}'] = close.rolling(window=window).mean()
+        
+        delta = close.diff()
+        gain = delta.where(delta > 0, 0).rolling(window=14).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+        result['rsi'] = 100 - (100 / (1 + gain / loss))
+        
+        exp1 = close.ewm(span=12, adjust=False).mean()
+        exp2 = close.ewm(span=26, adjust=False).mean()
+        result['macd'] = exp1 - exp2
+        result['macd_signal'] = result['macd'].ewm(span=9, adjust=False).mean()
+        result['macd_histogram'] = result['macd'] - result['macd_signal']
+        
+        result['bb_middle'] = close.rolling(window=20).mean()
+        bb_std = close.rolling(window=20).std()
+        result['bb_upper'] = result['bb_middle'] + bb_std * 2
+        result['bb_lower'] = result['bb_middle'] - bb_std * 2
+        results.append(result)
+    return pd.concat(results)
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_technical_indicators_match_pandas(kernels, seed):
+    frame = _make_prices(seed)
+    starts, ends = _ticker_slices(frame)
+    
+    result = kernels.technical_indicators(frame['close'].to_numpy(), starts, ends)
+    expected = _reference_indicators(frame)
+    
+    # pandas' online rolling variance keeps a residue of about 1e-9 of the
+    # price after a flat run, where the kernel's band width is exactly zero
+    assert result.shape == (len(INDICATOR_COLUMNS), len(frame))
+    for row, col in enumerate(INDICATOR_COLUMNS):
+        np.testing.assert_allclose(
+            result[row], expected[col].to_numpy(), rtol=1e-8, atol=1e-8, equal_nan=True, err_msg=col
+        )
+
+
+def test_technical_indicators_flat_prices_have_zero_width_bands(kernels):
+    frame = _make_prices()
+    starts, ends = _ticker_slices(frame)
+    
+    result = kernels.technical_indicators(frame['close'].to_numpy(), starts, ends)
+    
+    # Rows of ticker E whose 20 day window lies inside its flat run at 50
+    flat = np.flatnonzero((frame['ticker'] == 'E').to_numpy())[119:125]
+    middle, upper, lower = (
+        result[INDICATOR_COLUMNS.index(col), flat] for col in ('bb_middle', 'bb_upper', 'bb_lower')
+    )
+    np.testing.assert_allclose(middle, 50.0, rtol=1e-12)
+    np.testing.assert_array_equal(upper, middle)
+    np.testing.assert_array_equal(lower, middle)
+
+
+def test_segmented_cumsum_matches_groupby(kernels):
+    frame = _make_prices()
+    starts, ends = _ticker_slices(frame)
+    
+    result = kernels.segmented_cumsum(frame['close'].to_numpy(), starts, ends)
+    expected = frame.groupby('ticker', sort=False)['close'].cumsum()
+    
+    np.testing.assert_allclose(result, expected.to_numpy(), rtol=1e-12, equal_nan=True)
+
+
+def test_segmented_cumsum_leaves_rows_outside_ranges_missing(kernels):
+    values = np.arange(10, dtype=np.float64)
+    
+    result = kernels.segmented_cumsum(values, np.array([2, 6]), np.array([4, 9]))
+    
+    expected = [np.nan, np.nan, 2, 5, np.nan, np.nan, 6, 13, 21, np.nan]
+    np.testing.assert_array_equal(result, expected)
+
+
+def test_ohlc_violations_match_pandas(kernels):
+    rng = np.random.default_rng(0)
+    n = 1000
+    prices = pd.DataFrame({col: 100 + rng.standard_normal(n) for col in ('open', 'high', 'low', 'close')})
+    prices.loc[:99, 'high'] = prices.loc[:99, ['open', 'low', 'close']].max(axis=1) + 1
+    
+    result = kernels.ohlc_violations(*(prices[col].to_numpy() for col in ('open', 'high', 'low', 'close')))
+    
+    invalid_high = prices['high'] < prices[['open', 'low', 'close']].max(axis=1)
+    invalid_low = prices['low'] > prices[['open', 'high', 'close']].min(axis=1)
+    assert result == (invalid_high.sum(), invalid_low.sum())
+    assert 0 < result[0] < n - 100
+
+
+def test_ohlc_violations_valid_rows(kernels):
+    close = np.array([10.0, 11.0, 12.0])
+    
+    assert kernels.ohlc_violations(close, close + 1, close - 1, close) == (0, 0)